@@ -1,3 +1,10 @@
+import os.path as _path
+import warnings as _warnings
+
+_config_path = _path.join(_path.dirname(_path.abspath(__file__)), 'config.py')
+if not _path.exists(_config_path):
+    _warnings.warn(f"Setup the configuration file at: {_config_path}!")
+
 from .analysis import AnalysisAccessor
 from .api import BaseFeaturesAccessor, build_features_accessor, load_panel_from_disk
 from .panel_constructors import *
\ No newline at end of file
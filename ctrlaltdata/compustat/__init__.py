@@ -1 +1,7 @@
-from .compustat import Compustat
\ No newline at end of file
+def __getattr__(name):
+    # Compustat is imported on first access, so loading the features in .api when ctrlaltdata is imported does not
+    # also pull in pyodbc
+    if name == 'Compustat':
+        from .compustat import Compustat
+        return Compustat
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,16 +1,14 @@
-import pyodbc
 import pandas as pd
 import logging
 
-from ..database import SqlReader
+from ..database import SqlReader, sql_in_list
 from ..config import (COMPUSTAT_CONNECTION_STRING,
                       DATE_STRING_FORMAT_COMPUSTAT
                       )
 
 
 class Compustat(SqlReader):
-    def __init__(self):
-        self.connection = pyodbc.connect(COMPUSTAT_CONNECTION_STRING)
+    connection_string = COMPUSTAT_CONNECTION_STRING
 
     def get_sp_1500_index_membership(self, since, until):
         query = """SELECT
@@ -37,8 +35,7 @@ class Compustat(SqlReader):
                             until=until.strftime(DATE_STRING_FORMAT_COMPUSTAT))
 
         result = self.query(query)
-        result['gvkey'] = result.gvkey.apply(lambda x: str(x) if len(
-            str(x)) == 6 else '0' * (6 - len(str(x))) + str(x))
+        result['gvkey'] = result.gvkey.astype(str).str.zfill(6)
         result['in_index_since'] = pd.to_datetime(result['in_index_since'])
         result['in_index_until'] = pd.to_datetime(result['in_index_until'])
         return result
@@ -68,8 +65,7 @@ class Compustat(SqlReader):
                             until=until.strftime(DATE_STRING_FORMAT_COMPUSTAT))
 
         result = self.query(query)
-        result['gvkey'] = result.gvkey.apply(lambda x: str(x) if len(
-            str(x)) == 6 else '0' * (6 - len(str(x))) + str(x))
+        result['gvkey'] = result.gvkey.astype(str).str.zfill(6)
         result['in_index_since'] = pd.to_datetime(result['in_index_since'])
         result['in_index_until'] = pd.to_datetime(result['in_index_until'])
 
@@ -142,10 +138,9 @@ class Compustat(SqlReader):
                            feature_name=feature_name,
                            since=since.strftime(DATE_STRING_FORMAT_COMPUSTAT),
                            until=until.strftime(DATE_STRING_FORMAT_COMPUSTAT),
-                           gvkeys=",".join(["'{}'".format(gvkey) for gvkey in gvkeys]))
+                           gvkeys=sql_in_list(gvkeys))
         result = self.query(query)
-        result['gvkey'] = result.gvkey.apply(lambda x: str(x) if len(
-            str(x)) == 6 else '0' * (6 - len(str(x))) + str(x))
+        result['gvkey'] = result.gvkey.astype(str).str.zfill(6)
         result['date'] = pd.to_datetime(result['date'])
         return result
 
@@ -280,11 +275,11 @@ class Compustat(SqlReader):
             AND consol = 'C'
             AND datadate >= '{since}'
             AND datadate <= '{until}'
-            AND gvkey in ('{gvkeys}')
+            AND gvkey in ({gvkeys})
             AND srctype = '{filing_type}'
         """.format(**{'since': since.strftime(DATE_STRING_FORMAT_COMPUSTAT),
                       'until': until.strftime(DATE_STRING_FORMAT_COMPUSTAT),
-                      'gvkeys': "','".join([str(gvkey) for gvkey in gvkeys if not str(gvkey) == 'nan']),
+                      'gvkeys': sql_in_list(gvkey for gvkey in gvkeys if not str(gvkey) == 'nan'),
                       'filing_type': filing_type})
 
         result = self.query(query)
@@ -310,10 +305,9 @@ class Compustat(SqlReader):
                     AND co_hgic.gvkey in ({gvkeys})""".format(since=since.strftime(DATE_STRING_FORMAT_COMPUSTAT),
                                                               until=until.strftime(
                                                                   DATE_STRING_FORMAT_COMPUSTAT),
-                                                              gvkeys=",".join(["'{}'".format(i) for i in gvkeys]))
+                                                              gvkeys=sql_in_list(gvkeys))
         result = self.query(query)
-        result['gvkey'] = result.gvkey.astype(
-            str).apply(lambda x: '{0:0>6}'.format(x))
+        result['gvkey'] = result.gvkey.astype(str).str.zfill(6)
         result['GICSfrom'] = pd.to_datetime(result['GICSfrom'])
         result['GICSthru'] = pd.to_datetime(result['GICSthru'])
         return result
@@ -328,8 +322,8 @@ class Compustat(SqlReader):
                     WHERE cik IS NOT NULL
                         AND costat='A'
                         AND gvkey in ({gvkeys})
-                        AND cik in ({ciks})""".format(gvkeys=",".join(["'{}'".format(i) for i in gvkeys]),
-                                                      ciks=",".join(["'{}'".format(i) for i in ciks]))
+                        AND cik in ({ciks})""".format(gvkeys=sql_in_list(gvkeys),
+                                                      ciks=sql_in_list(ciks))
         elif len(gvkeys) > 0 and len(ciks) == 0:
             query = """SELECT
                     gvkey,
@@ -338,7 +332,7 @@ class Compustat(SqlReader):
                         company
                     WHERE cik IS NOT NULL
                         AND costat='A'
-                        AND gvkey in ({gvkeys})""".format(gvkeys=",".join(["'{}'".format(i) for i in gvkeys]))
+                        AND gvkey in ({gvkeys})""".format(gvkeys=sql_in_list(gvkeys))
         elif len(gvkeys) == 0 and len(ciks) > 0:
             query = """SELECT
                     gvkey,
@@ -347,7 +341,7 @@ class Compustat(SqlReader):
                         company
                     WHERE cik IS NOT NULL
                         AND costat='A'
-                        AND cik in ({ciks})""".format(ciks=",".join(["'{}'".format(i) for i in ciks]))
+                        AND cik in ({ciks})""".format(ciks=sql_in_list(ciks))
         else:
             query = """SELECT
                     gvkey,
@@ -357,8 +351,7 @@ class Compustat(SqlReader):
                     WHERE cik IS NOT NULL
                         AND costat='A'"""
         result = self.query(query)
-        result['gvkey'] = result.gvkey.astype(
-            str).apply(lambda x: '{0:0>6}'.format(x))
+        result['gvkey'] = result.gvkey.astype(str).str.zfill(6)
         result['cik'] = result.cik.astype(
             str).apply(lambda x: '{0:0>10}'.format(x))
         return result
@@ -368,7 +361,8 @@ class Compustat(SqlReader):
         query = self.query("""select  * from dbo.r_giccd""")
 
         def convert_to_dict(df, col):
-            return df[df.gictype == col].set_index('giccd')['gicdesc'].to_dict()
+            rows = df[df.gictype == col]
+            return dict(zip(rows['giccd'], rows['gicdesc']))
 
         top_level_dict['gsector'] = convert_to_dict(query, 'GSECTOR')
         top_level_dict['ggroup'] = convert_to_dict(query, 'GGROUP')
@@ -430,9 +424,9 @@ class Compustat(SqlReader):
                     co_ifndq.gvkey, co_ifndq.datadate
                     """.format(since=since.strftime(DATE_STRING_FORMAT_COMPUSTAT),
                                until=until.strftime(DATE_STRING_FORMAT_COMPUSTAT),
-                               gvkeys=",".join(["'{}'".format(gvkey) for gvkey in gvkeys]))
+                               gvkeys=sql_in_list(gvkeys))
         result = self.query(query)
-        result['gvkey'] = result.gvkey.astype(str).apply(lambda x: '{0:0>6}'.format(x))
+        result['gvkey'] = result.gvkey.astype(str).str.zfill(6)
         result['quarter_end_date'] = pd.to_datetime(result['quarter_end_date'])
         return result
 
@@ -461,9 +455,9 @@ class Compustat(SqlReader):
                     co_ifndq.gvkey, co_ifndq.datadate
                     """.format(since=since.strftime(DATE_STRING_FORMAT_COMPUSTAT),
                                until=until.strftime(DATE_STRING_FORMAT_COMPUSTAT),
-                               gvkeys=",".join(["'{}'".format(gvkey) for gvkey in gvkeys]))
+                               gvkeys=sql_in_list(gvkeys))
         result = self.query(query)
-        result['gvkey'] = result.gvkey.astype(str).apply(lambda x: '{0:0>6}'.format(x))
+        result['gvkey'] = result.gvkey.astype(str).str.zfill(6)
         result['date'] = pd.to_datetime(result['date'])
         return result
 
@@ -486,9 +480,9 @@ class Compustat(SqlReader):
                   AND cssecurity.effdate <= '{until}'
                 """.format(since=since.strftime(DATE_STRING_FORMAT_COMPUSTAT),
                            until=until.strftime(DATE_STRING_FORMAT_COMPUSTAT),
-                           cusips=",".join(["'{}'".format(cusip) for cusip in cusips]))
+                           cusips=sql_in_list(cusips))
         df = self.query(query)
-        df['gvkey'] = df['gvkey'].apply(lambda x: '{0:0>6}'.format(x))
+        df['gvkey'] = df['gvkey'].astype(str).str.zfill(6)
         return df
 
     def get_operating_cash_flow_since_until_by_gvkeys(self, since, until, gvkeys):
@@ -532,5 +526,5 @@ class Compustat(SqlReader):
                 SELECT cusip, tic as ticker
                 FROM dbo.security
                 WHERE tic in ({tickers})
-                """.format(tickers=",".join(["'{}'".format(ticker) for ticker in tickers]))
+                """.format(tickers=sql_in_list(tickers))
         return self.query(query)
@@ -1,16 +1,130 @@
+import logging
+import threading
+
 import pandas as pd
+import pyodbc
+
+# IN lists longer than this get slow to compile and can fail outright with error 8623
+_SQL_IN_LIST_WARNING_SIZE = 20000
+
+
+def sql_in_list(items):
+    """
+    Formats an iterable of identifiers as the quoted, comma separated body of a SQL `IN (...)` clause. Duplicates are
+    dropped and the identifiers sorted, so the same set of keys always gives the same SQL text, and an empty iterable
+    gives `''` which matches nothing.
+    """
+    items = sorted(set(map(str, items)))
+    if len(items) > _SQL_IN_LIST_WARNING_SIZE:
+        logging.warning(f"Building a SQL IN list of {len(items)} identifiers, very long lists can exhaust "
+                        f"SQL Server's query processor; consider batching the request.")
+    return "'" + "','".join(items) + "'"
 
 
 class SqlReader(object):
+    connection_string = None
+
     def __init__(self):
-        self.connection = None
+        self._local = threading.local()
 
-    def query(self, query, verbose=False, coerce_float=True):
+    @property
+    def connection(self):
+        """
+        The connection is opened lazily on first use, and each thread gets its own connection since pyodbc
+        connections cannot be shared between threads.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None and self.connection_string is not None:
+            connection = self._local.connection = pyodbc.connect(self.connection_string)
+        return connection
+
+    @connection.setter
+    def connection(self, connection):
+        self._local.connection = connection
+
+    def query(self, query, verbose=False, coerce_float=True, params=None, parse_dates=None, chunksize=None):
+        """
+        Runs a query and returns the result set as a DataFrame.
+
+        :param query: str, the SQL to run
+        :param verbose: bool, default False
+            Print the query before running it.
+        :param coerce_float: bool, default True
+            Convert decimal columns to float.
+        :param params: list, default None
+            Values for the `?` placeholders in the query.
+        :param parse_dates: list, default None
+            Columns to convert to datetime64 as the frame is built.
+        :param chunksize: int, default None
+            If given, fetch the rows in batches of this size and build the frame from the batches, so the driver's
+            row objects for only one batch are held at a time.
+        """
         if verbose:
             print(query)
-        return pd.read_sql_query(query, self.connection, coerce_float=coerce_float)
+        cursor = self.connection.cursor()
+        try:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            columns = [column[0] for column in cursor.description]
+            if chunksize:
+                chunks = []
+                rows = cursor.fetchmany(chunksize)
+                while rows:
+                    chunks.append(pd.DataFrame.from_records(rows, columns=columns, coerce_float=coerce_float))
+                    rows = cursor.fetchmany(chunksize)
+            else:
+                chunks = [pd.DataFrame.from_records(cursor.fetchall(), columns=columns, coerce_float=coerce_float)]
+        finally:
+            cursor.close()
+        if len(chunks) == 1:
+            result = chunks[0]
+        elif chunks:
+            result = pd.concat(chunks, ignore_index=True)
+        else:
+            result = pd.DataFrame.from_records([], columns=columns, coerce_float=coerce_float)
+        for column in parse_dates or []:
+            result[column] = pd.to_datetime(result[column])
+        return result
 
     def get_tables(self):
         return pd.read_sql_query("""
                                  SELECT * FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_TYPE='BASE TABLE'
                                  """, self.connection)
+
+    def upload_keys(self, table_name, keys, sql_type='VARCHAR(32)'):
+        """
+        Bulk loads a list of keys into a session temp table so that queries can join against it rather than
+        embedding a large `IN (...)` list in the SQL text. The table is recreated on every call and has a single
+        key column named `k`, with a clustered index for the joins.
+
+        :param table_name: str, name of the temp table, e.g. '#ibes_keys'
+        :param keys: iterable of keys, duplicates and nulls are dropped
+        :param sql_type: str, default 'VARCHAR(32)'
+            SQL Server type of the key column.
+        :return: int, the number of keys loaded
+        """
+        keys = [(k,) for k in dict.fromkeys(keys) if not pd.isna(k)]
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(f"IF OBJECT_ID('tempdb..{table_name}') IS NOT NULL DROP TABLE {table_name}")
+            # temp tables take tempdb's collation, so give character keys the database's own to join without conflicts
+            collate = ' COLLATE DATABASE_DEFAULT' if 'CHAR' in sql_type.upper() else ''
+            cursor.execute(f"CREATE TABLE {table_name} (k {sql_type}{collate})")
+            if keys:
+                cursor.fast_executemany = True
+                cursor.executemany(f"INSERT INTO {table_name} (k) VALUES (?)", keys)
+                # the collation can treat keys python sees as distinct as equal, e.g. 'abc' and 'ABC ', so dedupe again
+                # under the column's own comparison, the way an IN list would have matched them once
+                cursor.execute(f"""
+                    WITH numbered AS (SELECT ROW_NUMBER() OVER (PARTITION BY k ORDER BY (SELECT NULL)) AS n
+                                      FROM {table_name})
+                    DELETE FROM numbered WHERE n > 1""")
+                duplicates = max(cursor.rowcount, 0)
+            else:
+                duplicates = 0
+            cursor.execute(f"CREATE CLUSTERED INDEX ix_k ON {table_name} (k)")
+        finally:
+            cursor.close()
+        return len(keys) - duplicates
@@ -1 +1,7 @@
-from .fred import FredReader
\ No newline at end of file
+def __getattr__(name):
+    # FredReader is imported on first access, so loading the features in .api when ctrlaltdata is imported does not
+    # also pull in fredapi
+    if name == 'FredReader':
+        from .fred import FredReader
+        return FredReader
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
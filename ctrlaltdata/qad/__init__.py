@@ -1 +1,7 @@
-from .qad import QAD
+def __getattr__(name):
+    # QAD is imported on first access, so loading the features in .api when ctrlaltdata is imported does not
+    # also pull in pyodbc
+    if name == 'QAD':
+        from .qad import QAD
+        return QAD
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
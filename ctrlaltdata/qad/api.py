@@ -726,7 +726,7 @@ class Features():
         feature = qad.worldscope_add_last_actual(
             worldscope_keys, period=period, metric_code=3255, exact_match_allowed=exact_match_allowed)
 
-        self._obj.loc[self._obj.worldscope_key.isna(), 'worldscope_key'] = -99
+        self._obj['worldscope_key'] = self._obj['worldscope_key'].fillna(-99)
 
         self._obj = self._asof_merge_feature(feature,
                                              'total_debt',
@@ -759,7 +759,7 @@ class Features():
             worldscope_keys, period=period, metric_code=2005, exact_match_allowed=exact_match_allowed)
         feature.rename(
             columns={'cash___generic': 'cash_and_equivalents'}, inplace=True)
-        self._obj.loc[self._obj.worldscope_key.isna(), 'worldscope_key'] = -99
+        self._obj['worldscope_key'] = self._obj['worldscope_key'].fillna(-99)
 
         self._obj = self._asof_merge_feature(feature,
                                              'cash_and_equivalents',
@@ -828,7 +828,7 @@ class Features():
         minority_interest_feature = qad.worldscope_add_last_actual(
             worldscope_keys, period=period, metric_code=3426, exact_match_allowed=exact_match_allowed)
 
-        df.loc[df.worldscope_key.isna(), 'worldscope_key'] = "-99"
+        df['worldscope_key'] = df['worldscope_key'].fillna("-99")
 
         df = df.features._asof_merge_feature(pref_stock_feature,
                                              'preferred_stock',
@@ -1041,7 +1041,7 @@ class Features():
         )].worldscope_key.unique()
         feature = qad.worldscope_add_last_actual(
             worldscope_keys, period='A', metric_code=5101, exact_match_allowed=exact_match_allowed)
-        self._obj.loc[self._obj.worldscope_key.isna(), 'worldscope_key'] = -99
+        self._obj['worldscope_key'] = self._obj['worldscope_key'].fillna(-99)
 
         self._obj = self._asof_merge_feature(feature,
                                              'dividends_per_share',
@@ -1516,22 +1516,12 @@ class Features():
         self._warn_if_overwriting_and_delete('free_cash_flow')
         qad = ResourceManager().qad
 
-        funds_from_operation = qad.get_worldscope_feature(self._obj, feature_name='funds_from_operations',
-                                                          feature_code=4201,
-                                                          period=period,
-                                                          exact_match_allowed=exact_match_allowed,
-                                                          convert_currency=convert_currency,
-                                                          is_security_level=False, db_column_name=None)
-
-        capital_expenditures = qad.get_worldscope_feature(self._obj, feature_name='capital_expenditures',
-                                                          feature_code=4601,
-                                                          period=period,
-                                                          exact_match_allowed=exact_match_allowed,
-                                                          convert_currency=convert_currency,
-                                                          is_security_level=False,
-                                                          db_column_name='capital_expenditures__additions_to_fixed_assets_')
-
-        feature_panel = funds_from_operation.merge(capital_expenditures, on=panel_key)
+        feature_panel = qad.get_worldscope_features(self._obj,
+                                                    {'funds_from_operations': 4201, 'capital_expenditures': 4601},
+                                                    period=period,
+                                                    exact_match_allowed=exact_match_allowed,
+                                                    convert_currency=convert_currency,
+                                                    is_security_level=False)
         feature_panel['free_cash_flow'] = feature_panel['funds_from_operations'] - feature_panel['capital_expenditures']
         return self._obj.merge(feature_panel[panel_key + ['free_cash_flow']],
                                     on=panel_key, how='left')
@@ -1,19 +1,91 @@
-import pyodbc
 import pandas as pd
 import numpy as np
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-from ..database import SqlReader
+from ..database import SqlReader, sql_in_list
 from ..util import (clean_string,
+                    clean_string_series,
                     convert_metric_to_currency_aware_column)
 from ..config import (QAD_CONNECTION_STRING,
                       DATE_STRING_FORMAT_QAD
                       )
 
 
+# weight column names for the IdxSpCmp index codes
+_SP_MARKET_WEIGHT_COLUMNS = {203: 'sp_500_market_weight', 555: 'sp_1500_market_weight'}
+
+# number of security key mappings kept by QAD._cached_security_mapping
+_SECURITY_MAPPING_CACHE_SIZE = 32
+
+# most worldscope item queries QAD.get_worldscope_features runs at once
+_WORLDSCOPE_FEATURE_WORKERS = 8
+
+# most worldscope keys put in one vw_WSItemData IN list by QAD.get_worldscope_actuals
+_WORLDSCOPE_KEY_BATCH_SIZE = 1000
+
+# number of exchange rate tables kept by QAD.get_exchange_rate_since_until_by_currency_codes
+_EXCHANGE_RATE_CACHE_SIZE = 32
+
+
 class QAD(SqlReader):
+    connection_string = QAD_CONNECTION_STRING
+
     def __init__(self):
-        self.connection = pyodbc.connect(QAD_CONNECTION_STRING)
+        super().__init__()
+        self._ibes_metrics = None
+        self._ibes_metric_codes = None
+        self._worldscope_item_names = None
+        self._security_mappings = {}
+        self._security_mappings_lock = threading.Lock()
+        self._exchange_rates = {}
+        # the QAD instance is shared between threads, so evicting and storing rates happens under a lock
+        self._exchange_rates_lock = threading.Lock()
+
+    def _matched_securities_cte(self, cusip, sedol):
+        """
+        Loads the cusips and sedols into the #cusips and #sedols temp tables and builds a `matched` CTE of the
+        (seccode, typ) security master rows whose current or previous cusip or sedol is one of them, along with the
+        security_key_abbrev and security_key_name each row resolves to. Each branch of the union joins on a single
+        column so that SQL Server can seek on that column's index rather than evaluate a four way OR against every
+        row of the view, and the statement text stays the same whatever the number of keys.
+        """
+        self.upload_keys('#cusips', cusip, sql_type='VARCHAR(16)')
+        self.upload_keys('#sedols', sedol, sql_type='VARCHAR(16)')
+        return """
+        WITH hits AS (
+            SELECT m.seccode, m.typ, 1 AS sedol_hit, 0 AS cusip_hit
+                FROM vw_SecurityMasterX m INNER JOIN #sedols k ON m.sedol = k.k
+            UNION ALL
+            SELECT m.seccode, m.typ, 0 AS sedol_hit, 0 AS cusip_hit
+                FROM vw_SecurityMasterX m INNER JOIN #sedols k ON m.prevsedol = k.k
+            UNION ALL
+            SELECT m.seccode, m.typ, 0 AS sedol_hit, 1 AS cusip_hit
+                FROM vw_SecurityMasterX m INNER JOIN #cusips k ON m.cusip = k.k
+            UNION ALL
+            SELECT m.seccode, m.typ, 0 AS sedol_hit, 0 AS cusip_hit
+                FROM vw_SecurityMasterX m INNER JOIN #cusips k ON m.prevcusip = k.k
+        ),
+        matched AS (
+            SELECT
+                mastX.seccode,
+                mastX.typ,
+                CASE WHEN mastX.cusip IS NOT NULL THEN
+                    CASE WHEN hits.cusip_hit = 1 THEN mastX.cusip ELSE mastX.prevcusip END
+                ELSE
+                    CASE WHEN hits.sedol_hit = 1 THEN mastX.sedol ELSE mastX.prevSedol END
+                END AS security_key_abbrev,
+                CASE WHEN mastX.cusip IS NOT NULL THEN 'cusip' ELSE 'sedol' END AS security_key_name
+            FROM (
+                SELECT seccode, typ, MAX(sedol_hit) AS sedol_hit, MAX(cusip_hit) AS cusip_hit
+                FROM hits
+                GROUP BY seccode, typ
+            ) hits
+            INNER JOIN vw_SecurityMasterX mastX
+                ON mastX.seccode = hits.seccode
+                AND mastX.typ = hits.typ
+        )"""
 
     def get_daily_sp_index_membership(self, since, until, index_name='S&P 500 INDEX'):
         query = """
@@ -47,38 +119,23 @@ class QAD(SqlReader):
 
         WHERE
             index_info.Type_ = 1
-            AND index_info.Name = '{index_name}'
-            AND composition.Date_ >= '{since}'
-            AND composition.Date_ <= '{until}'
+            AND index_info.Name = ?
+            AND composition.Date_ >= ?
+            AND composition.Date_ <= ?
             AND index_security.Cusip IS NOT NULL
         ORDER BY
             composition.Weight
         DESC
-        """.format(since=since.strftime(DATE_STRING_FORMAT_QAD),
-                   until=until.strftime(DATE_STRING_FORMAT_QAD),
-                   index_name=index_name)
-        return self.query(query)
+        """
+        return self.query(query, params=[index_name,
+                                         since.strftime(DATE_STRING_FORMAT_QAD),
+                                         until.strftime(DATE_STRING_FORMAT_QAD)])
 
     def get_return_index_since_until_by_cusip_sedol(self, since, until, cusip, sedol):
-        if len(sedol) == 0:
-            sedol = ['']
-        if len(cusip) == 0:
-            cusip = ['']
-        query = """SELECT distinct 
-        mastX.typ,
-		CASE WHEN mastX.cusip IS NOT NULL THEN
-			CASE
-				WHEN mastX.cusip IN({cusips}) THEN mastX.cusip
-			ELSE mastX.prevcusip END 
-		ELSE
-			CASE
-				WHEN mastX.sedol IN({sedols}) THEN mastX.sedol
-			ELSE mastX.prevSedol END
-		END AS security_key_abbrev,
-		CASE 
-            WHEN mastX.cusip IS NOT NULL THEN 'cusip' 
-            ELSE 'sedol'
-        END AS security_key_name,
+        query = """{matched_securities}
+        SELECT distinct 
+		matched.security_key_abbrev,
+		matched.security_key_name,
         RI.marketdate AS date,
         RI.RI AS total_return_index
 
@@ -91,117 +148,96 @@ class QAD(SqlReader):
             ON mastX.seccode = mapX.seccode
             AND mastX.typ = mapX.typ
 
+        INNER JOIN matched
+            ON matched.seccode = mastX.seccode
+            AND matched.typ = mastX.typ
+
         WHERE mapX.ventype = 33    --the datastream ventype
         and MapX.Rank=1
-            AND RI.marketdate > '{since}'
-            AND RI.marketdate < '{until}'
-            AND ((mastX.sedol IN ({sedols}) OR mastX.prevsedol IN ({sedols}) )
-            OR (mastX.cusip IN ({cusips}) OR mastX.prevcusip IN ({cusips}))
-                )""".format(since=since.strftime(DATE_STRING_FORMAT_QAD),
-                            until=until.strftime(DATE_STRING_FORMAT_QAD),
-                            cusips=",".join(["'{}'".format(i) for i in cusip]),
-                            sedols=",".join(["'{}'".format(i) for i in sedol]))
-        result = self.query(query)
-        result['date'] = pd.to_datetime(result['date'])
-        keep = ['security_key_abbrev', 'security_key_name',
-                'date', 'total_return_index']
-        return result[keep]
+            AND RI.marketdate > ?
+            AND RI.marketdate < ?
+        """.format(matched_securities=self._matched_securities_cte(cusip, sedol))
+        result = self.query(query, params=[since.strftime(DATE_STRING_FORMAT_QAD),
+                                            until.strftime(DATE_STRING_FORMAT_QAD)])
+        result['date'] = pd.to_datetime(result['date'], format=DATE_STRING_FORMAT_QAD)
+        return result
 
     def get_security_keys_from_gvkeys(self, gvkey):
 
-        ROW_query = """
+        query = """
         select 
             map.seccode,
             map.typ, 
             map.startdate, 
             map.enddate,  
-            mast.sedol as security_key_abbrev,
-            'sedol' as security_key_name,
-            ROW.GVKEY,
-            ROW.IID        
+            mast.cusip as  security_key_abbrev,
+            'cusip' as security_key_name,
+            NA.GVKEY,
+            NA.IID        
         from dbo.vw_SecurityMappingX map
-            left join dbo.CSGSec ROW
-                on ROW.SECID=map.vencode
+            join dbo.csvsecurity NA
+                on NA.SECINTCODE=map.vencode
                 AND map.ventype=4
             join dbo.vw_SecurityMasterX mast
                 on mast.seccode=map.seccode
                 and mast.typ=map.typ
             where 
-                ROW.gvkey in ({gvkeys}) """.format(gvkeys=",".join(["'{}'".format(i) for i in gvkey]))
-        NA_query = """
+                NA.gvkey in ({gvkeys})
+        UNION ALL
         select 
             map.seccode,
             map.typ, 
             map.startdate, 
             map.enddate,  
-            mast.cusip as  security_key_abbrev,
-            'cusip' as security_key_name,
-            NA.GVKEY,
-            NA.IID        
+            mast.sedol as security_key_abbrev,
+            'sedol' as security_key_name,
+            ROW.GVKEY,
+            ROW.IID        
         from dbo.vw_SecurityMappingX map
-            join dbo.csvsecurity NA
-                on NA.SECINTCODE=map.vencode
+            left join dbo.CSGSec ROW
+                on ROW.SECID=map.vencode
                 AND map.ventype=4
             join dbo.vw_SecurityMasterX mast
                 on mast.seccode=map.seccode
                 and mast.typ=map.typ
             where 
-                NA.gvkey in ({gvkeys}) """.format(gvkeys=",".join(["'{}'".format(i) for i in gvkey]))
-        combined = pd.concat(
-            [pd.read_sql(NA_query, self.connection), pd.read_sql(ROW_query, self.connection)])
-        combined.loc[:, 'GVKEY'] = combined['GVKEY'].astype(
-            str).apply(lambda x: '{0:0>6}'.format(x))
+                ROW.gvkey in ({gvkeys}) """.format(gvkeys=sql_in_list(gvkey))
+        combined = self.query(query)
+        combined.loc[:, 'GVKEY'] = combined['GVKEY'].astype(str).str.zfill(6)
         return combined
 
     def get_gvkey_from_secintcode(self, secintcodes):
         """Query to map secintcode to gvkey, both compustat identifiers for North america.
         This is not a PIT mapping"""
         gvkeys_NA = self.query("""select secintcode, gvkey,'cusip' as security_key_name from CSVSecurity
-            where secintcode in ({codes})""".format(codes=",".join(["'{}'".format(i) for i in secintcodes])))
+            where secintcode in ({codes})""".format(codes=sql_in_list(secintcodes)))
         gvkeys_NA.loc[:, 'secintcode'] = gvkeys_NA.loc[:,
                                                        'secintcode'].astype(str)
-        gvkeys_NA.loc[:, 'gvkey'] = gvkeys_NA['gvkey'].astype(
-            str).apply(lambda x: '{0:0>6}'.format(x))
+        gvkeys_NA.loc[:, 'gvkey'] = gvkeys_NA['gvkey'].astype(str).str.zfill(6)
         return gvkeys_NA
 
     def get_gvkey_from_secid(self, secid):
         """Query to map seciid to gvkey, both compustat identifiers for ROW.
         This is not a PIT mapping"""
         gvkeys_ROW = self.query("""select secid, gvkey, 'sedol' as  security_key_name from CSGSec
-            where secid in ({codes})""".format(codes=",".join(["'{}'".format(i) for i in secid])))
+            where secid in ({codes})""".format(codes=sql_in_list(secid)))
         gvkeys_ROW.loc[:, 'secid'] = gvkeys_ROW.loc[:, 'secid'].astype(str)
-        gvkeys_ROW.loc[:, 'gvkey'] = gvkeys_ROW['gvkey'].astype(
-            str).apply(lambda x: '{0:0>6}'.format(x))
+        gvkeys_ROW.loc[:, 'gvkey'] = gvkeys_ROW['gvkey'].astype(str).str.zfill(6)
         return gvkeys_ROW
 
     def get_seccode_by_keys(self, cusip, sedol):
-        if len(sedol) == 0:
-            sedol = ['']
-        if len(cusip) == 0:
-            cusip = ['']
-        query = """SELECT distinct 
+        query = """{matched_securities}
+        SELECT distinct 
         mastX.typ,
         mastX.seccode,
-        CASE WHEN mastX.cusip IS NOT NULL THEN
-            CASE
-                WHEN mastX.cusip IN({cusips}) THEN mastX.cusip
-            ELSE mastX.prevcusip END 
-        ELSE
-            CASE
-                WHEN mastX.sedol IN({sedols}) THEN mastX.sedol
-            ELSE mastX.prevSedol END
-        END AS security_key_abbrev,
-        CASE 
-            WHEN mastX.cusip IS NOT NULL THEN 'cusip' 
-            ELSE 'sedol'
-        END AS security_key_name
+        matched.security_key_abbrev,
+        matched.security_key_name
 
         FROM vw_SecurityMasterX mastX
-
-        WHERE    ((mastX.sedol IN ({sedols}) OR mastX.prevsedol IN ({sedols}) )
-            OR (mastX.cusip IN ({cusips}) OR mastX.prevcusip IN ({cusips}))
-                )""".format(cusips=",".join(["'{}'".format(i) for i in cusip]),
-                            sedols=",".join(["'{}'".format(i) for i in sedol]))
+        INNER JOIN matched
+            ON matched.seccode = mastX.seccode
+            AND matched.typ = mastX.typ
+        """.format(matched_securities=self._matched_securities_cte(cusip, sedol))
         return self.query(query)
 
     def get_ticker_by_cusip(self, cusip):
@@ -211,10 +247,30 @@ class QAD(SqlReader):
             cusip,
             tic as ticker
             from CSVSecurity
-           WHERE cusip in ({cusips})""".format(cusips=",".join(["'{}'".format(i) for i in cusip]))
+           WHERE cusip in ({cusips})""".format(cusips=sql_in_list(cusip))
         return self.query(query)
 
     def get_exchange_rate_since_until_by_currency_codes(self, since, until, from_currency, to_currency):
+        """
+        Returns the spot mid rates between the currency codes over the date range. Results are kept per date range
+        and currency sets, so converting several metrics of the same panel queries the rates once.
+        """
+        cache_key = (since, until, frozenset(from_currency), frozenset(to_currency))
+        rates = self._exchange_rates.get(cache_key)
+        if rates is None:
+            rates = self._query_exchange_rates(since, until, from_currency, to_currency)
+            with self._exchange_rates_lock:
+                if len(self._exchange_rates) >= _EXCHANGE_RATE_CACHE_SIZE:
+                    # drop the oldest entry, dicts keep insertion order
+                    del self._exchange_rates[next(iter(self._exchange_rates))]
+                self._exchange_rates[cache_key] = rates
+        # callers add rows and columns to the rates, so hand out a copy
+        return rates.copy()
+
+    def _query_exchange_rates(self, since, until, from_currency, to_currency):
+        from_currency = sql_in_list(from_currency)
+        to_currency = sql_in_list(to_currency)
+        params = [since.strftime(DATE_STRING_FORMAT_QAD), until.strftime(DATE_STRING_FORMAT_QAD)]
         query = """
         SELECT
             fxcode.fromcurrcode AS from_currency ,
@@ -228,15 +284,12 @@ class QAD(SqlReader):
               ON fxcode.ExRateIntCode = fxrate.ExRateIntCode
 
         WHERE (fxcode.RateTypeCode = 'SPOT')
-              AND fxrate.exratedate > '{since}'
-              AND fxrate.exratedate < '{until}'
+              AND fxrate.exratedate > ?
+              AND fxrate.exratedate < ?
               AND  fxcode.fromcurrcode IN ({from_currency})
               AND  fxcode.tocurrcode IN ({to_currency}) 
-        """.format(since=since.strftime(DATE_STRING_FORMAT_QAD),
-                   until=until.strftime(DATE_STRING_FORMAT_QAD),
-                   from_currency=",".join(["'{}'".format(i)
-                                           for i in from_currency]),
-                   to_currency=",".join(["'{}'".format(i) for i in to_currency]))
+        """.format(from_currency=from_currency,
+                   to_currency=to_currency)
         # not all currency pairs exist in both directions in the database, i.e from SEK to USD exists but not USD to SEK
         # so perform a second query reversing to and from, invert the values and the to/from labels
         query_invert = """
@@ -251,47 +304,28 @@ class QAD(SqlReader):
               ON fxcode.ExRateIntCode = fxrate.ExRateIntCode
 
         WHERE (fxcode.RateTypeCode = 'SPOT')
-              AND fxrate.exratedate > '{since}'
-              AND fxrate.exratedate < '{until}'
+              AND fxrate.exratedate > ?
+              AND fxrate.exratedate < ?
               AND  fxcode.fromcurrcode IN ({to_currency}) 
               AND  fxcode.tocurrcode IN ({from_currency}) 
-        """.format(since=since.strftime(DATE_STRING_FORMAT_QAD),
-                   until=until.strftime(DATE_STRING_FORMAT_QAD),
-                   from_currency=",".join(["'{}'".format(i)
-                                           for i in from_currency]),
-                   to_currency=",".join(["'{}'".format(i) for i in to_currency]))
-        main_query = self.query(query).set_index(
-            ['from_currency', 'to_currency', 'date']).dropna(subset=['exchange_rate'])
-        invert_query = self.query(query_invert).set_index(
-            ['from_currency', 'to_currency', 'date']).dropna(subset=['exchange_rate'])
+        """.format(from_currency=from_currency,
+                   to_currency=to_currency)
+        main_query = self.query(query, params=params).dropna(subset=['exchange_rate'])
+        invert_query = self.query(query_invert, params=params).dropna(subset=['exchange_rate'])
         # filter out the values that exist in the main query
-        invert_query = invert_query[~invert_query.index.isin(main_query.index)]
-        result = pd.concat(
-            [main_query.reset_index(), invert_query.reset_index()])
-        result['date'] = pd.to_datetime(result['date'])
+        keys = ['from_currency', 'to_currency', 'date']
+        in_main = invert_query[keys].merge(main_query[keys].drop_duplicates(), on=keys, how='left',
+                                           indicator=True)['_merge'].to_numpy() == 'both'
+        result = pd.concat([main_query, invert_query[~in_main]], ignore_index=True)
+        result['date'] = pd.to_datetime(result['date'], format=DATE_STRING_FORMAT_QAD)
         return result
 
     def get_consolidated_share_count_since_until_by_cusip_sedol(self, since, until, cusip, sedol):
-        if len(sedol) == 0:
-            sedol = ['']
-        if len(cusip) == 0:
-            cusip = ['']
-        query = """
+        query = """{matched_securities}
         SELECT
 
-            CASE WHEN mastX.cusip IS NOT NULL THEN
-			    CASE
-				    WHEN mastX.cusip IN({cusips}) THEN mastX.cusip
-			        ELSE mastX.prevcusip END 
-		    ELSE
-			    CASE
-				    WHEN mastX.sedol IN({sedols}) THEN mastX.sedol
-			        ELSE mastX.prevSedol END
-		    END AS security_key_abbrev,
-		    CASE 
-                WHEN mastX.cusip IS NOT NULL THEN 'cusip' 
-                ELSE 'sedol'
-            END AS security_key_name,
+            matched.security_key_abbrev,
+		    matched.security_key_name,
             CA.VALDATE as date,
             CA.ConsolNumShrs*1000 as consolidated_share_count
         FROM dbo.DS2Mktval CA
@@ -303,39 +337,24 @@ class QAD(SqlReader):
             ON mastX.seccode = mapX.seccode
             AND mastX.typ = mapX.typ
 
+        INNER JOIN matched
+            ON matched.seccode = mastX.seccode
+            AND matched.typ = mastX.typ
+
         WHERE mapX.ventype = 33    --the datastream ventype
-            AND CA.VALDATE > '{since}'
-            AND CA.VALDATE < '{until}'
+            AND CA.VALDATE > ?
+            AND CA.VALDATE < ?
             AND MapX.rank=1
-            AND ((mastX.sedol IN ({sedols}) OR mastX.prevsedol IN ({sedols}))
-                OR (mastX.cusip IN ({cusips})OR mastX.prevcusip IN ({cusips})))
-        """.format(since=since.strftime(DATE_STRING_FORMAT_QAD),
-                   until=until.strftime(DATE_STRING_FORMAT_QAD),
-                   cusips=",".join(["'{}'".format(i) for i in cusip]),
-                   sedols=",".join(["'{}'".format(i) for i in sedol]))
-        return self.query(query)
+        """.format(matched_securities=self._matched_securities_cte(cusip, sedol))
+        return self.query(query, params=[since.strftime(DATE_STRING_FORMAT_QAD),
+                                          until.strftime(DATE_STRING_FORMAT_QAD)])
 
     def get_market_value_since_until_by_cusip_sedol(self, since, until, cusip, sedol):
-        if len(sedol) == 0:
-            sedol = ['']
-        if len(cusip) == 0:
-            cusip = ['']
-        query = """
+        query = """{matched_securities}
         SELECT
 
-            CASE WHEN mastX.cusip IS NOT NULL THEN
-			    CASE
-				    WHEN mastX.cusip IN({cusips}) THEN mastX.cusip
-			        ELSE mastX.prevcusip END 
-		    ELSE
-			    CASE
-				    WHEN mastX.sedol IN({sedols}) THEN mastX.sedol
-			        ELSE mastX.prevSedol END
-		    END AS security_key_abbrev,
-		    CASE 
-                WHEN mastX.cusip IS NOT NULL THEN 'cusip' 
-                ELSE 'sedol'
-            END AS security_key_name,
+            matched.security_key_abbrev,
+		    matched.security_key_name,
             CA.VALDATE as date,
             CA.currency as mkt_val_currency,
             CA.ConsolMktVal as consolidated_market_value
@@ -348,39 +367,24 @@ class QAD(SqlReader):
             ON mastX.seccode = mapX.seccode
             AND mastX.typ = mapX.typ
 
+        INNER JOIN matched
+            ON matched.seccode = mastX.seccode
+            AND matched.typ = mastX.typ
+
         WHERE mapX.ventype = 33    --the datastream ventype
-            AND CA.VALDATE > '{since}'
-            AND CA.VALDATE < '{until}'
+            AND CA.VALDATE > ?
+            AND CA.VALDATE < ?
             AND MapX.rank=1
-            AND ((mastX.sedol IN ({sedols}) OR mastX.prevsedol IN ({sedols}))
-                OR (mastX.cusip IN ({cusips})OR mastX.prevcusip IN ({cusips})))
-        """.format(since=since.strftime(DATE_STRING_FORMAT_QAD),
-                   until=until.strftime(DATE_STRING_FORMAT_QAD),
-                   cusips=",".join(["'{}'".format(i) for i in cusip]),
-                   sedols=",".join(["'{}'".format(i) for i in sedol]))
-        return self.query(query)
+        """.format(matched_securities=self._matched_securities_cte(cusip, sedol))
+        return self.query(query, params=[since.strftime(DATE_STRING_FORMAT_QAD),
+                                          until.strftime(DATE_STRING_FORMAT_QAD)])
 
     def get_market_cap_since_until_by_cusip_sedol(self, since, until, cusip, sedol):
-        if len(sedol) == 0:
-            sedol = ['']
-        if len(cusip) == 0:
-            cusip = ['']
-        query = """
+        query = """{matched_securities}
         SELECT
 
-            CASE WHEN mastX.cusip IS NOT NULL THEN
-			    CASE
-				    WHEN mastX.cusip IN({cusips}) THEN mastX.cusip
-			        ELSE mastX.prevcusip END 
-		    ELSE
-			    CASE
-				    WHEN mastX.sedol IN({sedols}) THEN mastX.sedol
-			        ELSE mastX.prevSedol END
-		    END AS security_key_abbrev,
-		    CASE 
-                WHEN mastX.cusip IS NOT NULL THEN 'cusip' 
-                ELSE 'sedol'
-            END AS security_key_name,
+            matched.security_key_abbrev,
+		    matched.security_key_name,
             CA.marketdate as date,
             CA.currency as mkt_cap_currency,
             CA.Mktcap as market_cap
@@ -393,39 +397,24 @@ class QAD(SqlReader):
             ON mastX.seccode = mapX.seccode
             AND mastX.typ = mapX.typ
 
+        INNER JOIN matched
+            ON matched.seccode = mastX.seccode
+            AND matched.typ = mastX.typ
+
         WHERE mapX.ventype = 33    --the datastream ventype
-            AND CA.MARKETDATE > '{since}'
-            AND CA.MARKETDATE < '{until}'
+            AND CA.MARKETDATE > ?
+            AND CA.MARKETDATE < ?
             AND MapX.rank=1
-            AND ((mastX.sedol IN ({sedols}) OR mastX.prevsedol IN ({sedols}))
-                OR (mastX.cusip IN ({cusips})OR mastX.prevcusip IN ({cusips})))
-        """.format(since=since.strftime(DATE_STRING_FORMAT_QAD),
-                   until=until.strftime(DATE_STRING_FORMAT_QAD),
-                   cusips=",".join(["'{}'".format(i) for i in cusip]),
-                   sedols=",".join(["'{}'".format(i) for i in sedol]))
-        return self.query(query)
+        """.format(matched_securities=self._matched_securities_cte(cusip, sedol))
+        return self.query(query, params=[since.strftime(DATE_STRING_FORMAT_QAD),
+                                          until.strftime(DATE_STRING_FORMAT_QAD)])
 
     def get_free_float_market_cap_since_until_by_cusip_sedol(self, since, until, cusip, sedol):
-        if len(sedol) == 0:
-            sedol = ['']
-        if len(cusip) == 0:
-            cusip = ['']
-        query = """
+        query = """{matched_securities}
         SELECT
 
-            CASE WHEN mastX.cusip IS NOT NULL THEN
-			    CASE
-				    WHEN mastX.cusip IN({cusips}) THEN mastX.cusip
-			        ELSE mastX.prevcusip END 
-		    ELSE
-			    CASE
-				    WHEN mastX.sedol IN({sedols}) THEN mastX.sedol
-			        ELSE mastX.prevSedol END
-		    END AS security_key_abbrev,
-		    CASE 
-                WHEN mastX.cusip IS NOT NULL THEN 'cusip' 
-                ELSE 'sedol'
-            END AS security_key_name,
+            matched.security_key_abbrev,
+		    matched.security_key_name,
             CA.marketdate as date,
             CA.currency as mkt_cap_currency,
             CA.FreeFloatMktCap as free_float_market_cap
@@ -438,39 +427,23 @@ class QAD(SqlReader):
             ON mastX.seccode = mapX.seccode
             AND mastX.typ = mapX.typ
 
+        INNER JOIN matched
+            ON matched.seccode = mastX.seccode
+            AND matched.typ = mastX.typ
+
         WHERE mapX.ventype = 33    --the datastream ventype
-            AND CA.MARKETDATE > '{since}'
-            AND CA.MARKETDATE < '{until}'
+            AND CA.MARKETDATE > ?
+            AND CA.MARKETDATE < ?
             AND MapX.rank=1
-            AND ((mastX.sedol IN ({sedols}) OR mastX.prevsedol IN ({sedols}))
-                OR (mastX.cusip IN ({cusips})OR mastX.prevcusip IN ({cusips})))
-        """.format(since=since.strftime(DATE_STRING_FORMAT_QAD),
-                   until=until.strftime(DATE_STRING_FORMAT_QAD),
-                   cusips=",".join(["'{}'".format(i) for i in cusip]),
-                   sedols=",".join(["'{}'".format(i) for i in sedol]))
-        return self.query(query)
+        """.format(matched_securities=self._matched_securities_cte(cusip, sedol))
+        return self.query(query, params=[since.strftime(DATE_STRING_FORMAT_QAD),
+                                          until.strftime(DATE_STRING_FORMAT_QAD)])
 
     def get_closing_price_since_until_by_cusip_sedol(self, since, until, adj_type, cusip, sedol):
-        if len(sedol) == 0:
-            sedol = ['']
-        if len(cusip) == 0:
-            cusip = ['']
-        query = """
+        query = """{matched_securities}
         SELECT
-            CASE 
-                WHEN mastX.cusip IS NOT NULL THEN
-			        CASE
-				        WHEN mastX.cusip IN({cusips}) THEN mastX.cusip
-			            ELSE mastX.prevcusip END 
-		        ELSE
-			        CASE
-				            WHEN mastX.sedol IN({sedols}) THEN mastX.sedol
-			        ELSE mastX.prevSedol END
-		    END AS security_key_abbrev,
-		    CASE 
-                WHEN mastX.cusip IS NOT NULL THEN 'cusip' 
-                ELSE 'sedol'
-            END AS security_key_name,
+            matched.security_key_abbrev,
+		    matched.security_key_name,
             pricing.close_ AS datastream_closing_price,
             pricing.marketdate AS date,
             pricing.AdjType,
@@ -484,43 +457,28 @@ class QAD(SqlReader):
             ON mastX.seccode = mapX.seccode
             AND mastX.typ = mapX.typ
 
+        INNER JOIN matched
+            ON matched.seccode = mastX.seccode
+            AND matched.typ = mastX.typ
+
         WHERE mapX.ventype = 33    --the datastream ventype
-            AND pricing.marketdate > '{since}'
-            AND pricing.marketdate < '{until}'
-            AND pricing.adjtype = {AdjTyp}
+            AND pricing.marketdate > ?
+            AND pricing.marketdate < ?
+            AND pricing.adjtype = ?
             AND pricing.IsPrimExchQt = 'Y'
             and MapX.Rank=1
-            AND ((mastX.sedol IN ({sedols}) OR mastX.prevsedol IN ({sedols}))
-                OR (mastX.cusip IN ({cusips})OR mastX.prevcusip IN ({cusips})))
-        """.format(since=since.strftime(DATE_STRING_FORMAT_QAD),
-                   until=until.strftime(DATE_STRING_FORMAT_QAD),
-                   AdjTyp=adj_type,
-                   cusips=",".join(["'{}'".format(i) for i in cusip]),
-                   sedols=",".join(["'{}'".format(i) for i in sedol]))
-        return self.query(query)
+        """.format(matched_securities=self._matched_securities_cte(cusip, sedol))
+        return self.query(query, params=[since.strftime(DATE_STRING_FORMAT_QAD),
+                                          until.strftime(DATE_STRING_FORMAT_QAD),
+                                          adj_type])
 
     def get_common_shares_one_listing(self, since, until, cusip, sedol):
-        if len(sedol) == 0:
-            sedol = ['']
-        if len(cusip) == 0:
-            cusip = ['']
         # note that Datastream gives share  in units of thousands so divide by 1000
-        query = """
+        query = """{matched_securities}
         SELECT
 
-            CASE WHEN mastX.cusip IS NOT NULL THEN
-			    CASE
-				    WHEN mastX.cusip IN({cusips}) THEN mastX.cusip
-			        ELSE mastX.prevcusip END 
-		    ELSE
-			    CASE
-				    WHEN mastX.sedol IN({sedols}) THEN mastX.sedol
-			        ELSE mastX.prevSedol END
-		    END AS security_key_abbrev,
-		    CASE 
-                WHEN mastX.cusip IS NOT NULL THEN 'cusip' 
-                ELSE 'sedol'
-            END AS security_key_name,
+            matched.security_key_abbrev,
+		    matched.security_key_name,
             DS.EVENTDATE as date,
             DS.NumShrs /1000 as common_shares
 
@@ -534,19 +492,22 @@ class QAD(SqlReader):
             ON mastX.seccode = mapX.seccode
             AND mastX.typ = mapX.typ
 
+        INNER JOIN matched
+            ON matched.seccode = mastX.seccode
+            AND matched.typ = mastX.typ
+
         WHERE mapX.ventype = 33    --the datastream ventype
-            AND DS.EVENTDATE > '{since}'
-            AND DS.EVENTDATE < '{until}'
+            AND DS.EVENTDATE > ?
+            AND DS.EVENTDATE < ?
             AND MapX.rank=1
-            AND ((mastX.sedol IN ({sedols}) OR mastX.prevsedol IN ({sedols}))
-                OR (mastX.cusip IN ({cusips})OR mastX.prevcusip IN ({cusips})))
-        """.format(since=since.strftime(DATE_STRING_FORMAT_QAD),
-                   until=until.strftime(DATE_STRING_FORMAT_QAD),
-                   cusips=",".join(["'{}'".format(i) for i in cusip]),
-                   sedols=",".join(["'{}'".format(i) for i in sedol]))
-        return self.query(query)
+        """.format(matched_securities=self._matched_securities_cte(cusip, sedol))
+        return self.query(query, params=[since.strftime(DATE_STRING_FORMAT_QAD),
+                                          until.strftime(DATE_STRING_FORMAT_QAD)])
 
     def lookup_ibes_metrics(self):
+        # the TreCode catalog is static, so it is only fetched once per connection
+        if self._ibes_metrics is not None:
+            return self._ibes_metrics.copy()
         query = """
                 SELECT  tre1.code,
                         tre1.description AS code_name,
@@ -558,37 +519,22 @@ class QAD(SqlReader):
                 AND     tre2.codetype = 5
                """
         result = self.query(query)
-        result['description'] = result['description'].apply(
-            lambda x: clean_string(x))
-        return result
+        result['description'] = clean_string_series(result['description'])
+        self._ibes_metrics = result
+        return result.copy()
 
     def lookup_ibes_metric_by_name(self, metric_name):
-        metrics = self.lookup_ibes_metrics()
-        metric_code = metrics.loc[metrics.description ==
-                                  metric_name, 'code'].values[0]
-        return metric_code
+        if self._ibes_metric_codes is None:
+            metrics = self.lookup_ibes_metrics().drop_duplicates('description')
+            self._ibes_metric_codes = dict(zip(metrics['description'], metrics['code']))
+        return self._ibes_metric_codes[metric_name]
 
     def get_ibes_key(self, cusip, sedol):
-        if len(sedol) == 0:
-            sedol = ['']
-        if len(cusip) == 0:
-            cusip = ['']
         # for the mapping to be logical, need to match on same typ
-        query = """
+        query = """{matched_securities}
         SELECT 
-            CASE WHEN mastX.cusip IS NOT NULL THEN
-			    CASE
-				    WHEN mastX.cusip IN({cusips}) THEN mastX.cusip
-			        ELSE mastX.prevcusip END 
-		    ELSE
-			    CASE
-				    WHEN mastX.sedol IN({sedols}) THEN mastX.sedol
-			        ELSE mastX.prevSedol END
-		        END AS security_key_abbrev,
-		    CASE 
-                WHEN mastX.cusip IS NOT NULL THEN 'cusip' 
-                ELSE 'sedol'
-            END AS security_key_name,
+            matched.security_key_abbrev,
+		    matched.security_key_name,
             entity.Rank, -- Integer listing quotes, each new quote is one higher
             entity.Exchange, -- 1 for US, 2 for Canada, 0 for RoW
             entity.EstPermID as ibes_key,
@@ -597,6 +543,9 @@ class QAD(SqlReader):
             q.IsPrimary -- 1= primary quote
                 
             FROM	dbo.vw_SecurityMasterX  mastX
+            INNER JOIN matched
+                ON matched.seccode = mastX.seccode
+                AND matched.typ = mastX.typ
                 LEFT JOIN 
             -- Want to join with PermSecMapX on the quote object p.EntType = 55
             -- but also for US and Canada on Instrument object p.EntType = 49
@@ -640,13 +589,9 @@ class QAD(SqlReader):
                     AND ((entity.regcode='1' and mastX.typ='1') OR (entity.regcode='0' and mastX.typ='6'))
                 -- join on Quote information to ascertain if it is the primary quote!
                     LEFT JOIN PermQuoteRef q
-                        ON     q.QuotePermID = entity.QuotePermID              
-            
-                    WHERE ((mastX.sedol IN ({sedols}) OR mastX.prevsedol IN ({sedols}))
-                        OR (mastX.cusip IN ({cusips})OR mastX.prevcusip IN ({cusips})))
-                        AND entity.EstPermID IS NOT NULL""".format(
-            cusips=",".join(["'{}'".format(i) for i in cusip]),
-            sedols=",".join(["'{}'".format(i) for i in sedol]))
+                        ON     q.QuotePermID = entity.QuotePermID
+                    WHERE entity.EstPermID IS NOT NULL""".format(
+            matched_securities=self._matched_securities_cte(cusip, sedol))
         # sort query results by preference for matches
         result = self.query(query).sort_values(
             ['security_key_abbrev', 'IsPrimary', 'Rank', 'Exchange'], ascending=[True, False, True, True])
@@ -655,28 +600,33 @@ class QAD(SqlReader):
                                                            'ibes_key'].astype(int).astype(str)
         return result
 
+    def _upload_ibes_keys(self, ibes_keys):
+        """
+        Loads the IBES keys into the #ibes_keys temp table which the IBES queries join against.
+        """
+        return self.upload_keys('#ibes_keys',
+                                [int(ibes_key) for ibes_key in ibes_keys if not pd.isna(ibes_key)],
+                                sql_type='BIGINT')
+
     def get_ibes_fp0_date(self,
                           ibes_keys,
                           period_type=4):
-        if len(ibes_keys) > 1:
-            ibes_keys = ",".join(["'{}'".format(ibes_key)
-                                  for ibes_key in ibes_keys])
-        else:
-            ibes_keys = str(ibes_keys[0])
+        self._upload_ibes_keys(ibes_keys)
 
         query = f"""
                 SELECT	EstPermID AS ibes_key,
                         EffectiveDate AS date,
                         PerEndDate AS ibes_period{period_type}_fp0
                 FROM	dbo.TREPerAdvance
-                WHERE	EstPermID in ({ibes_keys})
-                AND		PerType = {period_type}
+                INNER JOIN #ibes_keys k
+                ON      k.k = EstPermID
+                WHERE	PerType = ?
                 """
 
-        result = self.query(query)
+        result = self.query(query, params=[period_type])
         result[f'ibes_period{period_type}_fp0'] = pd.to_datetime(
-            result[f'ibes_period{period_type}_fp0'])
-        result['date'] = pd.to_datetime(result['date'])
+            result[f'ibes_period{period_type}_fp0'], format=DATE_STRING_FORMAT_QAD)
+        result['date'] = pd.to_datetime(result['date'], format=DATE_STRING_FORMAT_QAD)
         result['ibes_key'] = result['ibes_key'].astype('str')
         return result
 
@@ -685,24 +635,21 @@ class QAD(SqlReader):
                           ibes_keys,
                           period_type=4,
                           forecast_period=1):
-        if len(ibes_keys) > 1:
-            ibes_keys = ",".join(["'{}'".format(ibes_key)
-                                  for ibes_key in ibes_keys])
-        else:
-            ibes_keys = str(ibes_keys[0])
+        self._upload_ibes_keys(ibes_keys)
 
         query = f"""    
                 SELECT	EstPermID AS ibes_key,
                         ExpireDate AS expire_date,
                         PerEndDate AS period_end_date_fp{forecast_period}
-                FROM    dbo.TREPerIndex        
-                WHERE	EstPermID IN ({ibes_keys})
-                AND		PerType = {period_type}
+                FROM    dbo.TREPerIndex
+                INNER JOIN #ibes_keys k
+                ON      k.k = EstPermID
+                WHERE	PerType = ?
                 """
-        result = self.query(query)
-        result['expire_date'] = pd.to_datetime(result['expire_date'])
+        result = self.query(query, params=[period_type])
+        result['expire_date'] = pd.to_datetime(result['expire_date'], format=DATE_STRING_FORMAT_QAD)
         result[f'period_end_date_fp{forecast_period}'] = pd.to_datetime(
-            result[f'period_end_date_fp{forecast_period}'])
+            result[f'period_end_date_fp{forecast_period}'], format=DATE_STRING_FORMAT_QAD)
         result['ibes_key'] = result['ibes_key'].astype('str')
         return result
 
@@ -714,11 +661,7 @@ class QAD(SqlReader):
                            period_type=4,
                            forecast_period=1):
 
-        if len(ibes_keys) > 1:
-            ibes_keys = ",".join(["'{}'".format(ibes_key)
-                                  for ibes_key in ibes_keys])
-        else:
-            ibes_keys = str(ibes_keys[0])
+        self._upload_ibes_keys(ibes_keys)
 
         metric_code = self.lookup_ibes_metric_by_name(metric_name)
 
@@ -734,19 +677,20 @@ class QAD(SqlReader):
                         DefHighEst*DefScale as {metric_name}_pred_high,
                         DefLowEst*DefScale as {metric_name}_pred_low
                 FROM	dbo.TRESumPer
-                WHERE	PerType = {period_type}
-                AND		EstPermID IN ({ibes_keys})
-                AND     measure = {metric_code}
-                AND		PerEndDate > '{since}'
-                AND		EffectiveDate < '{until}'
+                INNER JOIN #ibes_keys k
+                ON      k.k = EstPermID
+                WHERE	PerType = ?
+                AND     measure = ?
+                AND		PerEndDate > ?
+                AND		EffectiveDate < ?
                 AND     IsParent= '0';
                 """
 
-        result = self.query(query)
+        result = self.query(query, params=[period_type, metric_code, since, until])
         result.loc[:, 'DefCurrPermID'] = result['DefCurrPermID'].astype(str)
-        result['date'] = pd.to_datetime(result['date'])
+        result['date'] = pd.to_datetime(result['date'], format=DATE_STRING_FORMAT_QAD)
         result[f'period{period_type}_end_date_fp{forecast_period}'] = pd.to_datetime(
-            result[f'period{period_type}_end_date_fp{forecast_period}'])
+            result[f'period{period_type}_end_date_fp{forecast_period}'], format=DATE_STRING_FORMAT_QAD)
         result['ibes_key'] = result['ibes_key'].astype('str')
         return result
 
@@ -777,11 +721,7 @@ class QAD(SqlReader):
         forecast_period : int, optional
             The forecast period for which forecasts are to be returned. The default is 1.
         """
-        if len(ibes_keys) > 1:
-            ibes_keys = ",".join(["'{}'".format(ibes_key)
-                                  for ibes_key in ibes_keys])
-        else:
-            ibes_keys = str(ibes_keys[0])
+        self._upload_ibes_keys(ibes_keys)
 
         metric_code = self.lookup_ibes_metric_by_name(metric_name)
 
@@ -795,19 +735,20 @@ class QAD(SqlReader):
                         DefCurrPermID,
                         IsExcluded as is_excluded
                 FROM	dbo.TREDetPer
-                WHERE	PerType = {period_type}
-                AND		EstPermID IN ({ibes_keys})
-                AND     measure = {metric_code}
-                AND		PerEndDate > '{since}'
-                AND		EffectiveDate < '{until}'
+                INNER JOIN #ibes_keys k
+                ON      k.k = EstPermID
+                WHERE	PerType = ?
+                AND     measure = ?
+                AND		PerEndDate > ?
+                AND		EffectiveDate < ?
                 AND     IsParent= '0';
                 """
 
-        result = self.query(query)
+        result = self.query(query, params=[period_type, metric_code, since, until])
         result.loc[:, 'DefCurrPermID'] = result['DefCurrPermID'].astype(str)
-        result['date'] = pd.to_datetime(result['date'])
+        result['date'] = pd.to_datetime(result['date'], format=DATE_STRING_FORMAT_QAD)
         result[f'period{period_type}_end_date_fp{forecast_period}'] = pd.to_datetime(
-            result[f'period{period_type}_end_date_fp{forecast_period}'])
+            result[f'period{period_type}_end_date_fp{forecast_period}'], format=DATE_STRING_FORMAT_QAD)
         result['ibes_key'] = result['ibes_key'].astype('str')
         result['broker_id'] = result['broker_id'].astype('str')
         return result
@@ -819,11 +760,7 @@ class QAD(SqlReader):
                          ibes_keys,
                          period_type=4):
 
-        if len(ibes_keys) > 1:
-            ibes_keys = ",".join(["'{}'".format(ibes_key)
-                                  for ibes_key in ibes_keys])
-        else:
-            ibes_keys = str(ibes_keys[0])
+        self._upload_ibes_keys(ibes_keys)
 
         metric_code = self.lookup_ibes_metric_by_name(metric_name)
 
@@ -835,18 +772,19 @@ class QAD(SqlReader):
                         DefActValue*DefScale AS {metric_name},
                         DefCurrPermID
                 FROM	dbo.TREActRpt
-                WHERE	PerType = {period_type}
-                AND		EstPermID IN ({ibes_keys})
-                AND     measure = {metric_code}
-                AND		EffectiveDate < '{until}'
+                INNER JOIN #ibes_keys k
+                ON      k.k = EstPermID
+                WHERE	PerType = ?
+                AND     measure = ?
+                AND		EffectiveDate < ?
                 AND     IsParent= '0';
                 """
 
-        result = self.query(query)
+        result = self.query(query, params=[period_type, metric_code, until])
         result.loc[:, 'DefCurrPermID'] = result['DefCurrPermID'].astype(str)
-        result['date'] = pd.to_datetime(result['date'])
+        result['date'] = pd.to_datetime(result['date'], format=DATE_STRING_FORMAT_QAD)
         result[f'period_end_date_act'] = pd.to_datetime(
-            result[f'period_end_date_act'])
+            result[f'period_end_date_act'], format=DATE_STRING_FORMAT_QAD)
         result['ibes_key'] = result['ibes_key'].astype('str')
         return result
 
@@ -857,8 +795,9 @@ class QAD(SqlReader):
                             dbo.TreCode m
                             where m.CodeType=7
                             and m.code in ({codes})
-                            """.format(codes=",".join(["'{}'".format(i) for i in codes]))
-        return self.query(query).set_index('Code')['Currency'].to_dict()
+                            """.format(codes=sql_in_list(codes))
+        result = self.query(query)
+        return dict(zip(result['Code'], result['Currency']))
 
     def get_issuer_cusip8s_by_cusip8(self, cusip8s):
         query = """SELECT DISTINCT
@@ -878,7 +817,7 @@ class QAD(SqlReader):
                             prc.PrcInfo) as b
                    on a.issuer = b.issuer
                    WHERE a.cusip in ({cusips})
-        """.format(cusips=",".join(["'{}'".format(i) for i in cusip8s]))
+        """.format(cusips=sql_in_list(cusip8s))
         result = self.query(query)
         return result
 
@@ -897,7 +836,7 @@ class QAD(SqlReader):
                    RDCSecMapX.VenType = 55
                    AND RDCSecMapX.Exchange = 1
                    AND RDCSecMapX.seccode in ({seccode})
-        """.format(seccode=",".join(["'{}'".format(int(i)) for i in seccode]))
+        """.format(seccode=sql_in_list(int(i) for i in seccode))
         result = self.query(query)
         return result
 
@@ -918,13 +857,11 @@ class QAD(SqlReader):
                     JOIN CSGREF R2 ON C.GSECTOR = R2.REFCD1 AND R2.REFTYPE = 15
                     JOIN CSGREF R3 ON C.GGROUP = R3.REFCD1 AND R3.REFTYPE = 15 
 	                JOIN CSGREF R4 ON C.GIND = R4.REFCD1 AND R4.REFTYPE = 15
-                where (C.INDTHRU IS NULL or C.INDTHRU >= '{since}')
-                AND (C.INDFROM <= '{until}')
+                where (C.INDTHRU IS NULL or C.INDTHRU >= ?)
+                AND (C.INDFROM <= ?)
                          AND  C.gvkey in ({gvkeys})
                    
-                """.format(since=since.strftime(DATE_STRING_FORMAT_QAD),
-                           until=until.strftime(DATE_STRING_FORMAT_QAD),
-                           gvkeys=",".join(["'{}'".format(i) for i in ROW_gvkeys]))
+                """.format(gvkeys=sql_in_list(ROW_gvkeys))
         #this table has North american history
         query_na = """
         SELECT 
@@ -941,28 +878,23 @@ class QAD(SqlReader):
             JOIN DBO.SPG2CODE C2 ON C2.CODE = LEFT(G.GSUBIND,4) AND C2.TYPE_ = 3
             JOIN DBO.SPG2CODE C3 ON C3.CODE = LEFT(G.GSUBIND,6) AND C3.TYPE_ = 4
             JOIN DBO.SPG2CODE C4 ON C4.CODE = G.GSUBIND AND C4.TYPE_ = 5
-            WHERE (G.ENDDATE IS NULL or G.ENDDATE >= '{since}')
-                AND (G.STARTDATE <= '{until}')
+            WHERE (G.ENDDATE IS NULL or G.ENDDATE >= ?)
+                AND (G.STARTDATE <= ?)
                 AND G.GVKEY in ({gvkeys}) ORDER BY G.STARTDATE    
-                """.format(since=since.strftime(DATE_STRING_FORMAT_QAD),
-                           until=until.strftime(DATE_STRING_FORMAT_QAD),
-                           gvkeys=",".join(["'{}'".format(i) for i in NA_gvkeys]))
-        result=pd.DataFrame()
-        if len(NA_gvkeys)>0:
-            result=pd.concat([result,self.query(query_na)])
-        if len(ROW_gvkeys)>0:
-            result=pd.concat([result,self.query(query_row)])
+                """.format(gvkeys=sql_in_list(NA_gvkeys))
+        params = [since.strftime(DATE_STRING_FORMAT_QAD), until.strftime(DATE_STRING_FORMAT_QAD)]
+        results = []
+        if len(NA_gvkeys) > 0:
+            results.append(self.query(query_na, params=params, parse_dates=['GICS_since', 'GICS_until']))
+        if len(ROW_gvkeys) > 0:
+            results.append(self.query(query_row, params=params, parse_dates=['GICS_since', 'GICS_until']))
+        result = pd.concat(results, ignore_index=True) if results else pd.DataFrame()
         if not result.empty:
-            result['GICS_since'] = pd.to_datetime(
-                result['GICS_since'])
-            result['GICS_until'] = pd.to_datetime(
-                result['GICS_until'])
-            result['gvkey'] = result.gvkey.apply(lambda x: str(x) if len(
-                str(x)) == 6 else '0' * (6 - len(str(x))) + str(x))
+            result['gvkey'] = result.gvkey.astype(str).str.zfill(6)
         return result
 
     def get_sector_by_gic(self):
-        query = f"""
+        query = """
         SELECT DISTINCT(g.SubindustryCode) AS gic,
             g.Sector as sector,
             g.IndustryGroup as industry_group,
@@ -974,53 +906,63 @@ class QAD(SqlReader):
         result['gic'] = result.gic.astype(str)
         return result
 
-    def get_sp_500_market_weights(self, since, until, cusips):
+    def get_sp_market_weights(self, since, until, cusips, idx_codes=(203, 555)):
+        """
+        S&P index market weights for several indexes in a single scan of IdxSpCmp, with one weight column per index.
+        The S&P 500 is a subset of the 1500 so the rows overlap heavily, and a security missing from an index has NaN
+        in that index's column.
+
+        :param idx_codes: tuple of int, default (203, 555)
+            IdxSpCmp index codes, 203 for the S&P 500 and 555 for the S&P 1500.
+        """
         query = """
                 SELECT 
                     S.Cusip as security_key_abbrev,
                     'cusip' as security_key_name,
                     N.Date_ as date,
-                    N."Weight" / 100 as sp_500_market_weight
+                    N.IdxCode as idx_code,
+                    N."Weight" / 100 as market_weight
                 FROM 
                     qai.dbo.IdxSpCmp N
                 JOIN 
                     qai.PRC.IDXSEC S
                     ON S.code = N.SecCode
-                       AND N.IdxCode = 203
                        AND S.vendor = 1
                 WHERE
-                    S.Cusip in ({cusips})
-                    AND N.Date_ >= '{since}'
-                    AND N.Date_ <= '{until}'
-                """.format(since=since.strftime(DATE_STRING_FORMAT_QAD),
-                           until=until.strftime(DATE_STRING_FORMAT_QAD),
-                           cusips=",".join(["'{}'".format(i) for i in cusips]))
-        return self.query(query)
+                    N.IdxCode in ({idx_codes})
+                    AND S.Cusip in ({cusips})
+                    AND N.Date_ >= ?
+                    AND N.Date_ <= ?
+                """.format(idx_codes=','.join(str(int(code)) for code in idx_codes),
+                           cusips=sql_in_list(cusips))
+        result = self.query(query, params=[since.strftime(DATE_STRING_FORMAT_QAD),
+                                           until.strftime(DATE_STRING_FORMAT_QAD)])
+        return self._pivot_sp_market_weights(result, idx_codes)
+
+    @staticmethod
+    def _pivot_sp_market_weights(result, idx_codes):
+        """Turns the long IdxSpCmp rows into one weight column per index code, in the order of `idx_codes`"""
+        keys = ['security_key_abbrev', 'security_key_name', 'date']
+        # a cusip can map to more than one IDXSEC code, so keep the first weight per index to unstack on unique keys
+        result = (result.drop_duplicates(keys + ['idx_code'])
+                  .set_index(keys + ['idx_code'])['market_weight']
+                  .unstack('idx_code')
+                  .reindex(columns=list(idx_codes))
+                  .rename(columns=_SP_MARKET_WEIGHT_COLUMNS)
+                  .reset_index())
+        result.columns.name = None
+        return result
+
+    def get_sp_500_market_weights(self, since, until, cusips):
+        return self.get_sp_market_weights(since, until, cusips, idx_codes=(203,))
 
     def get_sp_1500_market_weights(self, since, until, cusips):
-        query = """
-                SELECT 
-                    S.Cusip as security_key_abbrev,
-                    'cusip' as security_key_name,
-                    N.Date_ as date,
-                    N."Weight" / 100 as sp_1500_market_weight
-                FROM 
-                    qai.dbo.IdxSpCmp N
-                JOIN 
-                    qai.PRC.IDXSEC S
-                    ON S.code = N.SecCode
-                       AND N.IdxCode = 555
-                       AND S.vendor = 1
-                WHERE
-                    S.Cusip in ({cusips})
-                    AND N.Date_ >= '{since}'
-                    AND N.Date_ <= '{until}'
-                """.format(since=since.strftime(DATE_STRING_FORMAT_QAD),
-                           until=until.strftime(DATE_STRING_FORMAT_QAD),
-                           cusips=",".join(["'{}'".format(i) for i in cusips]))
-        return self.query(query)
+        return self.get_sp_market_weights(since, until, cusips, idx_codes=(555,))
 
     def get_merger_target_announcement_dates(self, since, until, cusip=[], sedol=[]):
+        # Deal data is keyed on 6 character issuer codes, so truncate once and keep the mapping back to the full cusip
+        cusip_lookup = {c[:6]: c for c in cusip}
+        sedols = [s[:6] for s in sedol]
         query = """
                 SELECT
                 CASE 
@@ -1059,71 +1001,54 @@ class QAD(SqlReader):
         if len(cusip) > 0 and len(sedol) > 0:
             query += """
                      AND  (org.Cusip in ({cusips}) OR org.Sedol in ({sedols}))
-                     """.format(cusips=",".join(["'{}'".format(i[:6]) for i in cusip]),
-                                sedols=",".join(["'{}'".format(i[:6])
-                                                 for i in sedol]),
+                     """.format(cusips=sql_in_list(cusip_lookup),
+                                sedols=sql_in_list(sedols),
                                 )
         elif len(cusip) > 0:
             query += """
                      AND  org.Cusip in ({cusips})
-                     """.format(cusips=",".join(["'{}'".format(i[:6]) for i in cusip]),
+                     """.format(cusips=sql_in_list(cusip_lookup),
                                 )
         elif len(sedol) > 0:
             query += """
                       AND  org.Sedol in ({sedols})
-                      """.format(sedols=",".join(["'{}'".format(i[:6]) for i in sedol]),
+                      """.format(sedols=sql_in_list(sedols),
                                  )
         feature = self.query(query)
-        lookup = {c[:6]: c for c in cusip}
         feature['merger_target_announce_date'] = pd.to_datetime(
-            feature['merger_target_announce_date'])
-        feature.loc[feature['security_key_name'] == 'cusip',
-                    'security_key_abbrev'] = feature.loc[feature['security_key_name'] == 'cusip', 'security_key_temp'].map(lookup)
+            feature['merger_target_announce_date'], format=DATE_STRING_FORMAT_QAD)
+        is_cusip = feature['security_key_name'] == 'cusip'
+        feature.loc[is_cusip, 'security_key_abbrev'] = feature.loc[is_cusip, 'security_key_temp'].map(cusip_lookup)
         return feature
 
     def get_vendor_code(self, ventype, cusip=[], sedol=[]):
-        sedols = ["''" if len(sedol) == 0 else ",".join(
-            ["'{}'".format(i) for i in sedol])][0]
-        cusips = ["''" if len(cusip) == 0 else ",".join(
-            ["'{}'".format(i) for i in cusip])][0]
-        query = f"""
+        query = """{matched_securities}
                 SELECT
-                    CASE
-                        WHEN mastX.cusip IS NOT NULL THEN
-                        CASE
-                            WHEN mastX.cusip IN({cusips}) THEN mastX.cusip
-                        ELSE mastX.prevcusip END
-                    ELSE
-                        CASE
-                            WHEN mastX.sedol IN({sedols}) THEN mastX.sedol
-                        ELSE mastX.prevSedol END
-                    END AS security_key_abbrev,
+                    matched.security_key_abbrev,
                         MapX.VenCode as ven_code
                 FROM vw_SecurityMasterX mastX
+                INNER JOIN matched
+                    ON matched.seccode = mastX.seccode
+                    AND matched.typ = mastX.typ
                 INNER JOIN vw_SecurityMappingX MapX
                     ON mastX.seccode = MapX.seccode
                     AND mastX.typ = MapX.typ
-                WHERE MapX.ventype={str(ventype)}
+                WHERE MapX.ventype=?
                     AND MapX.Rank=1
-                    AND ((mastX.sedol IN ({sedols})
-                        OR mastX.prevsedol IN ({sedols}))
-                        OR (mastX.cusip IN ({cusips})
-                            OR mastX.prevcusip IN ({cusips})))
-
-                """
-        return self.query(query)
+                """.format(matched_securities=self._matched_securities_cte(cusip, sedol))
+        return self.query(query, params=[ventype])
 
     def get_vendor_type_name(self, ventype):
         """for a ventype used in the vw_SecurityMappingX view, return the name of the vendor"""
-        query = f"""SELECT VenName
+        query = """SELECT VenName
                 FROM SecVenType
-                WHERE VenType ={ventype}"""
-        return self.query(query).iloc[0].VenName
+                WHERE VenType = ?"""
+        return self.query(query, params=[ventype]).iloc[0].VenName
 
     def get_last_fiscal_end_dates(self, df, period):
         worldscope_company_mapping_col = 'Worldscope Company Mapping'
-        codes = ",".join(["'{}'".format(i) for i in df[~df[worldscope_company_mapping_col].isna(
-        )][worldscope_company_mapping_col].unique()])
+        codes = sql_in_list(df[~df[worldscope_company_mapping_col].isna(
+        )][worldscope_company_mapping_col].unique())
         query = f"""
                 SELECT
                        Date_ as end_date,
@@ -1132,31 +1057,32 @@ class QAD(SqlReader):
                        code 
                 FROM dbo.Wsddata
                 WHERE code in ({codes})
-                    AND freq='{period}'
+                    AND freq=?
                     AND Item='5905'
                 ORDER BY Year_ DESC"""
-        return self.query(query)
+        return self.query(query, params=[period])
 
     def datastream_index_constituents(self, since, until, index_code):
         """ return the index constituents for an index in the datastream monthly index table"""
         query = """
             select i.StartDate as in_index_since, 
-                ISNULL(i.EndDate, '{until}') as in_index_until,
+                ISNULL(i.EndDate, ?) as in_index_until,
                 i.infocode
             from Ds2ConstMth i 
-                where i.indexlistintcode='{index_code}'
-                    AND ISNULL(i.EndDate, '{until}') >= '{since}'
-            """.format(since=since.strftime(DATE_STRING_FORMAT_QAD),
-                       until=until.strftime(DATE_STRING_FORMAT_QAD),
-                       index_code=index_code)
-        result = self.query(query)
-        if not result[result.infocode.isna()].empty:
+                where i.indexlistintcode=?
+                    AND ISNULL(i.EndDate, ?) >= ?
+            """
+        since = since.strftime(DATE_STRING_FORMAT_QAD)
+        until = until.strftime(DATE_STRING_FORMAT_QAD)
+        result = self.query(query,
+                            params=[until, str(index_code), until, since],
+                            parse_dates=['in_index_since', 'in_index_until'])
+        missing_infocode = result.infocode.isna()
+        if missing_infocode.any():
             logging.warning(
-                'missing index infocodes - {}'.format(result[result.infocode.isna()]))
-            result = result[~result.infocode.isna()]
+                'missing index infocodes - {}'.format(result[missing_infocode]))
+            result = result[~missing_infocode]
             result.loc[:, 'infocode'] = result.loc[:, 'infocode'].astype(int)
-        result['in_index_since'] = pd.to_datetime(result['in_index_since'])
-        result['in_index_until'] = pd.to_datetime(result['in_index_until'])
         return result
 
     def datastream_index_weights(self, since, until, index_code):
@@ -1169,19 +1095,20 @@ class QAD(SqlReader):
             
                from Ds2ConstDataMth w
                 where 
-                    w.indexlistintcode='{index_code}'
-                    and W.Date_<='{until}'
-                    and W.Date_>='{since}'
-            """.format(since=since.strftime(DATE_STRING_FORMAT_QAD),
-                       until=until.strftime(DATE_STRING_FORMAT_QAD),
-                       index_code=index_code)
-        result = self.query(query)
-        if not result[result.infocode.isna()].empty:
+                    w.indexlistintcode=?
+                    and W.Date_<=?
+                    and W.Date_>=?
+            """
+        result = self.query(query, params=[str(index_code),
+                                           until.strftime(DATE_STRING_FORMAT_QAD),
+                                           since.strftime(DATE_STRING_FORMAT_QAD)])
+        missing_infocode = result.infocode.isna()
+        if missing_infocode.any():
             logging.warning(
-                'missing index infocodes - {}'.format(result[result.infocode.isna()]))
-            result = result[~result.infocode.isna()]
+                'missing index infocodes - {}'.format(result[missing_infocode]))
+            result = result[~missing_infocode]
             result.loc[:, 'infocode'] = result.loc[:, 'infocode'].astype(int)
-        result['date'] = pd.to_datetime(result['date'])
+        result['date'] = pd.to_datetime(result['date'], format=DATE_STRING_FORMAT_QAD)
         if result.empty:
             logging.warning(
                 f'no index weights for this inndex code={index_code}, possible liscening issue')
@@ -1196,13 +1123,14 @@ class QAD(SqlReader):
         """Query the Datastream table listing indexes available to search for all matching indexes
         If no search term given, return whole table"""
         if search_term:
-            query = f"""
+            query = """
             select
                 IndexListIntCode as index_code,
                 IndexListDesc as index_name,
                 IndexListMnem as index_mnemonic
             FROM Ds2IndexList
-                where IndexListDesc like '%{search_term}%'"""
+                where IndexListDesc like ?"""
+            return self.query(query, params=[f'%{search_term}%'])
         else:
             query = """
             select 
@@ -1216,8 +1144,8 @@ class QAD(SqlReader):
         """given an DataStream index name, find the index numeric code """
         query = """select distinct IndexListIntCode from 
             Ds2IndexList
-            where IndexListDesc = '{index_name}'""".format(index_name=index_name)
-        result = self.query(query)
+            where IndexListDesc = ?"""
+        result = self.query(query, params=[index_name])
         if result.empty:
             return False
         else:
@@ -1243,13 +1171,13 @@ class QAD(SqlReader):
             and map.typ=mastX.typ
         where map.vencode in ({infocode})
             and map.ventype='33'
-            """.format(infocode=",".join(["'{}'".format(i) for i in infocodes]))
+            """.format(infocode=sql_in_list(infocodes))
 
         result = self.query(query)
         result = result[~result.infocode.isna()]
         result.loc[:, 'infocode'] = result.loc[:, 'infocode'].astype(int)
-        result['startdate'] = pd.to_datetime(result['startdate'])
-        result['enddate'] = pd.to_datetime(result['enddate'])
+        result['startdate'] = pd.to_datetime(result['startdate'], format=DATE_STRING_FORMAT_QAD)
+        result['enddate'] = pd.to_datetime(result['enddate'], format=DATE_STRING_FORMAT_QAD)
         return result
 
     def get_security_keys_from_infocodes_now(self, infocodes):
@@ -1266,18 +1194,20 @@ class QAD(SqlReader):
             on D.seccode=X.seccode
               and D.typ=X.typ
             where vencode in ({infocode})
-            """.format(infocode=",".join(["'{}'".format(i) for i in infocodes]))
+            """.format(infocode=sql_in_list(infocodes))
         result = self.query(query)
         result = result[~result.infocode.isna()]
         result.loc[:, 'infocode'] = result.loc[:, 'infocode'].astype(int)
         return result
 
     def worldscope_item_name_dictionary(self):
-        """query the worldscope tables to create a dictionary from item code to item name"""
-        d = self.query("""select Number, Name from dbo.Wsitem
-            """)
-        d.set_index('Number', inplace=True)
-        return d.to_dict()['Name']
+        """query the worldscope tables to create a dictionary from item code to item name.
+        The item table is static so it is only queried once per instance"""
+        if self._worldscope_item_names is None:
+            d = self.query("""select Number, Name from dbo.Wsitem
+                """)
+            self._worldscope_item_names = dict(zip(d['Number'], d['Name']))
+        return dict(self._worldscope_item_names)
 
     def get_worldscope_actuals(self, period, metric_code, worldscope_keys):
         """Query the vw_WSItemData view, which hosts fundamental data. Grab the EPSReportDate and currency if relevant
@@ -1291,33 +1221,72 @@ class QAD(SqlReader):
                 f.itemUnits
             from dbo.vw_WSItemData f
                 WHERE code in ({codes})
-                AND freq='{period}'
-                AND Item='{item}'
+                AND freq=?
+                AND Item=?
             ORDER BY worldscope_key,epsReportDate DESC,fiscalPeriodEndDate DESC
-            """.format(period=period,
-                       item=metric_code,
-                       codes=",".join(["'{}'".format(i) for i in worldscope_keys]
-                                      ))
-        result = self.query(query)
+            """
+        # query in fixed size batches so each IN list stays seekable and the statement text repeats between calls,
+        # an empty key list still runs once and returns the empty, correctly typed frame
+        keys = sorted(set(map(str, worldscope_keys)))
+        result = pd.concat([self.query(query.format(codes=sql_in_list(keys[i:i + _WORLDSCOPE_KEY_BATCH_SIZE])),
+                                       params=[period, str(metric_code)])
+                            for i in range(0, max(len(keys), 1), _WORLDSCOPE_KEY_BATCH_SIZE)],
+                           ignore_index=True)
         result['worldscope_key'] = result['worldscope_key'].astype(str)
+        return self._prepare_worldscope_actuals(result, metric_code)
 
+    def _prepare_worldscope_actuals(self, result, metric_code):
+        """Parses the currency out of itemUnits and names the Value_ column after the metric"""
         # want to keep itemUnits if either a 3 digit isocurr3ency code of isocurrency/share
-        result['itemUnits'] = np.where(result.itemUnits.str.contains("/share"),
-                                       result['itemUnits'].str.split(
-                                           pat='/share', n=1, expand=True)[0],
-                                       result['itemUnits'])
-
-        result['worldscope_currency'] = np.where(result['itemUnits'].str.len() == 3,
-                                                 result['itemUnits'],
-                                                 np.NAN)
+        # there are only a handful of distinct units, so parse those and map the results back onto the rows
+        units = pd.Series(result['itemUnits'].unique())
+        cleaned_units = units.str.split(pat='/share', n=1).str[0]
+        currencies = cleaned_units.where(cleaned_units.str.len() == 3)
+        result['worldscope_currency'] = result['itemUnits'].map(dict(zip(units, currencies)))
+        result['itemUnits'] = result['itemUnits'].map(dict(zip(units, cleaned_units)))
 
         metric_name = clean_string(
             self.worldscope_item_name_dictionary()[metric_code])
         result.rename(columns={'Value_': metric_name}, inplace=True)
         return result
 
+    def get_worldscope_actuals_for_cusips(self, cusip=[], sedol=[], period='A', metric_code=None):
+        """Query the vw_WSItemData actuals for a set of cusips/sedols in a single round trip. The mapping from
+        security to Worldscope company code is done server side in a CTE, rather than by calling
+        get_worldscope_company_code and then get_worldscope_actuals with the returned codes.
+        Rows come back in report date order, so they can be as-of merged without sorting again."""
+        query = """{matched_securities},
+            company AS (
+                SELECT DISTINCT
+                        matched.security_key_abbrev,
+                        cmap.vencode as worldscope_key
+                    FROM vw_SecurityMasterX mastX
+                    INNER JOIN matched
+                        ON matched.seccode = mastX.seccode
+                        AND matched.typ = mastX.typ
+                    INNER JOIN vw_WsCompanyMapping cmap
+                        ON mastX.seccode = cmap.seccode
+                        AND mastX.typ = cmap.typ
+            )
+            SELECT
+                company.security_key_abbrev,
+                f.code as worldscope_key,
+                f.fiscalPeriodEndDate fiscal_period_end_date,
+                f.epsReportDate as date,
+                f.Value_,
+                f.itemUnits
+            from dbo.vw_WSItemData f
+                INNER JOIN company ON f.code = company.worldscope_key
+                WHERE freq=?
+                AND Item=?
+            ORDER BY epsReportDate,fiscalPeriodEndDate
+            """.format(matched_securities=self._matched_securities_cte(cusip, sedol))
+        result = self.query(query, params=[period, str(metric_code)])
+        result['worldscope_key'] = result['worldscope_key'].astype(str)
+        return self._prepare_worldscope_actuals(result, metric_code)
+
     def worldscope_add_last_actual(self, worldscope_keys, period='A', metric_code=None, exact_match_allowed=True,
-                                   keep_period_end_date=False, add_period_to_column_name=False):
+                                   keep_period_end_date=False, add_period_to_column_name=False, column_names=None):
         """ Adds in the last reported actual for the period type and metric provided.
         Provide either metric name or integer code as per  qad.worldscope_item_name_dictionary()
         :list(int) worldscope_keys: security/company keys for worldscope tables
@@ -1326,90 +1295,102 @@ class QAD(SqlReader):
         bool exact_match_allowed: Allow same day merges, if False joins with previous dat
         bool keep_period_end_date: Add a column denoting the period end date
         bool add_period_to_column_name: add'last_annual'/'last_quarter' to column names to avoid confusion
+        dict column_names: renames applied to the returned columns, e.g. {'worldscope_key': 'worldscope_security_key'}
 
         """
         metric_name = clean_string(
             self.worldscope_item_name_dictionary()[metric_code])
+        is_quarterly = period in ["E", "Q", "H", "I", "R", "@"]
+        column_name = metric_name
+        if add_period_to_column_name:
+            column_name += "_last_quarter" if is_quarterly else "_last_annual"
+        period_end_name = 'last_reported_quarter_end_date' if is_quarterly else 'last_reported_annual_end_date'
+        keep = ['date', 'worldscope_key', column_name]
+        if keep_period_end_date:
+            keep.append(period_end_name)
+        labels = [column_names.get(column, column) for column in keep] if column_names else keep
+
         feature = self.get_worldscope_actuals(
-            period, metric_code, worldscope_keys)
-        if feature.empty:
-            return pd.DataFrame()
-        else:
-            feature = convert_metric_to_currency_aware_column(feature,
-                                                              metric_name,
-                                                              'worldscope_currency')
-            feature['date'] = pd.to_datetime(feature['date'])
-
-            if add_period_to_column_name:
-                if period in ["E", "Q", "H", "I", "R", "@"]:
-                    feature.rename(
-                        columns={metric_name: metric_name+"_last_quarter"}, inplace=True)
-                    metric_name = metric_name+"_last_quarter"
-                else:
-                    feature.rename(
-                        columns={metric_name: metric_name+"_last_annual"}, inplace=True)
-                    metric_name = metric_name+"_last_annual"
-            keep = ['date', 'worldscope_key', metric_name]
-            if keep_period_end_date:
-                if period in ["E", "Q", "H", "I", "R", "@"]:
-                    feature.rename(columns={
-                                   'fiscal_period_end_date': 'last_reported_quarter_end_date'}, inplace=True)
-                    keep.append('last_reported_quarter_end_date')
-                else:
-                    feature.rename(
-                        columns={'fiscal_period_end_date': 'last_reported_annual_end_date'}, inplace=True)
-                    keep.append('last_reported_annual_end_date')
-
-            return feature[~feature.date.isna()][keep]
+            period, metric_code, worldscope_keys) if len(worldscope_keys) > 0 else None
+        if feature is None or feature.empty:
+            # keep the usual columns so callers can still merge_asof the (missing) metric onto their panel
+            empty = pd.DataFrame(columns=labels, dtype=object)
+            empty[labels[0]] = pd.to_datetime(empty[labels[0]])
+            return empty
+
+        feature = convert_metric_to_currency_aware_column(feature,
+                                                          metric_name,
+                                                          'worldscope_currency')
+        feature['date'] = pd.to_datetime(feature['date'], format=DATE_STRING_FORMAT_QAD)
+        feature.rename(columns={metric_name: column_name, 'fiscal_period_end_date': period_end_name}, inplace=True)
+        feature = feature.loc[feature.date.notna(), keep]
+        # relabel the selected copy in place rather than renaming into yet another frame
+        feature.columns = labels
+        return feature
+
+    def _cached_security_mapping(self, name, keys, fetch):
+        """
+        Returns the mapping frame `fetch()` gives for a panel's keys, reusing the frame from an earlier call with the
+        same mapping name and keys, so adding several features to the same panel only queries the mapping once.
+        """
+        cache_key = (name, frozenset(keys['cusip']), frozenset(keys['sedol']))
+        mapping = self._security_mappings.get(cache_key)
+        if mapping is None:
+            mapping = fetch()
+            # evict and store under the lock, the instance is shared between threads
+            with self._security_mappings_lock:
+                if len(self._security_mappings) >= _SECURITY_MAPPING_CACHE_SIZE:
+                    # drop the oldest entry, dicts keep insertion order
+                    del self._security_mappings[next(iter(self._security_mappings))]
+                self._security_mappings[cache_key] = mapping
+        return mapping
+
+    def _worldscope_mapping(self, panel, is_security_level=False):
+        """
+        Returns the security level frame mapping `security_key_abbrev` to `worldscope_key`, or to
+        `worldscope_security_key` when `is_security_level`, for the securities in the panel.
+        """
+        def fetch():
+            if is_security_level:
+                feature = self.get_vendor_code(10, **keys)
+                feature = feature.rename(columns={'ven_code': 'worldscope_security_key'})
+            else:
+                feature = self.get_worldscope_company_code(**keys)
+            feature.loc[:, name] = feature.loc[:, name].astype(str)
+            return feature
+
+        name = 'worldscope_security_key' if is_security_level else 'worldscope_key'
+        keys = panel.features._get_keys(abbreviated=True)
+        return self._cached_security_mapping(name, keys, fetch)
 
     def worldscope_security_key(self, panel):
         """
         Adds Worldscope security Mapping column as worldscope_key. Warning many worldscope values are not filled at the security level 
         """
-        panel = panel.features.vendor_code(
-            ventype=10, rename_column=True)
-
-        return panel.rename(columns={'Worldscope Company Mapping': 'worldscope_security_key'})
+        feature = self._worldscope_mapping(panel, is_security_level=True)
+        return pd.merge(panel, feature, on='security_key_abbrev', how='left')
 
     def worldscope_key(self, panel):
         """
         Adds Worldscope Company Mapping column as worldscope_key
         """
-        keys = panel.features._get_keys(abbreviated=True)
-        feature = self.get_worldscope_company_code(**keys)
-        feature.loc[:, 'worldscope_key'] = feature.loc[:,
-                                                       'worldscope_key'].astype(str)
+        feature = self._worldscope_mapping(panel)
         return pd.merge(panel, feature, on='security_key_abbrev', how='left')
 
     def get_worldscope_company_code(self, cusip=[], sedol=[]):
         """SQL query to map from sedol or cusip to Worldscope Company identifier, rather than security identifier"""
-        sedols = ["''" if len(sedol) == 0 else ",".join(
-            ["'{}'".format(i) for i in sedol])][0]
-        cusips = ["''" if len(cusip) == 0 else ",".join(
-            ["'{}'".format(i) for i in cusip])][0]
-        query = f"""        
+        query = """{matched_securities}
             SELECT
-                    CASE
-                        WHEN mastX.cusip IS NOT NULL THEN
-                        CASE
-                            WHEN mastX.cusip IN({cusips}) THEN mastX.cusip
-                        ELSE mastX.prevcusip END
-                    ELSE
-                        CASE
-                            WHEN mastX.sedol IN({sedols}) THEN mastX.sedol
-                        ELSE mastX.prevSedol END
-                    END AS security_key_abbrev,
+                    matched.security_key_abbrev,
                         cmap.vencode as worldscope_key
                 FROM vw_SecurityMasterX mastX
+                INNER JOIN matched
+                    ON matched.seccode = mastX.seccode
+                    AND matched.typ = mastX.typ
                 INNER JOIN vw_WsCompanyMapping cmap
                     ON mastX.seccode = cmap.seccode
                     AND mastX.typ = cmap.typ
-                WHERE ((mastX.sedol IN ({sedols})
-                        OR mastX.prevsedol IN ({sedols}))
-                        OR (mastX.cusip IN ({cusips})
-                            OR mastX.prevcusip IN ({cusips})))
-
-                """
+                """.format(matched_securities=self._matched_securities_cte(cusip, sedol))
         return self.query(query)
 
     def worldscope_industrial_classification(self, worldscope_keys):
@@ -1425,7 +1406,7 @@ class QAD(SqlReader):
 			        on I.Item=H.field
 			        and I.Value_=H.Value_
                 where I.Code in ({codes})
-                    and I.Item='6010'""".format(codes=",".join(["'{}'".format(i) for i in worldscope_keys]))
+                    and I.Item='6010'""".format(codes=sql_in_list(worldscope_keys))
         result = self.query(query)
         result.loc[:, 'worldscope_key'] = result.loc[:,
                                                      'worldscope_key'].astype(str)
@@ -1441,15 +1422,24 @@ class QAD(SqlReader):
 
         if "worldscope_key" not in df.columns:
             df = self.worldscope_key(df)
-        worldscope_keys = df[~df.worldscope_key.isna()].worldscope_key.unique()
-        feature = self.worldscope_add_last_actual(
-            worldscope_keys, period=period, metric_code=2005, exact_match_allowed=exact_match_allowed)
+        keys = df.features._get_keys(abbreviated=True)
+        if len(keys['cusip']) == 0 and len(keys['sedol']) == 0:
+            df['cash_and_equivalents'] = np.nan
+            return df.drop(columns=['worldscope_key'])
+        feature = self.get_worldscope_actuals_for_cusips(period=period, metric_code=2005, **keys)
         feature.rename(
             columns={'cash___generic': "cash_and_equivalents"}, inplace=True)
+        feature = convert_metric_to_currency_aware_column(feature, 'cash_and_equivalents', 'worldscope_currency')
+        feature['date'] = pd.to_datetime(feature['date'], format=DATE_STRING_FORMAT_QAD)
+        # every security of a company brings back the company's reports, so keep one row per company and date,
+        # the last one as merge_asof would pick
+        feature = (feature.loc[feature.date.notna(), ['date', 'worldscope_key', 'cash_and_equivalents']]
+                   .drop_duplicates(['date', 'worldscope_key'], keep='last'))
         df.loc[df.worldscope_key.isna(), 'worldscope_key'] = -99
 
+        # merge per company code, a security can map to more than one; feature is already in date order from the query
         df = pd.merge_asof(df.sort_values(['date']),
-                           feature.sort_values(['date']),
+                           feature,
                            on='date', by='worldscope_key', allow_exact_matches=exact_match_allowed)
         df.drop(columns=['worldscope_key'], inplace=True)
 
@@ -1464,125 +1454,57 @@ class QAD(SqlReader):
         Current and past consituents are in different tables, so need to separately query for each.
         Note that compustat security tables have cusip and sedol but we default to instead using
         the core QAD table mapping in vw_securityMappingX because it has validitiy dates for the mapping"""
-        # first look for US and Canadian index members
-        NA_query_current = """ 
-            SELECT
-                B.FROM_ as in_index_since,
-                ISNULL(B.THRU, '{until}') as in_index_until,
-                B.iid as iid,
-                B.gvkey as gvkey,
-                B.gvkeyx
-            from dbo.CSIdxCstHis B		
-                where 
-                    B.GVKEYX in ('000003','118341')
-                    AND ISNULL(B.THRU, '{until}') >= '{since}'
-            """.format(since=since.strftime(DATE_STRING_FORMAT_QAD),
-                           until=until.strftime(DATE_STRING_FORMAT_QAD))
-        NA_query_history = """ 
-            SELECT
-                B.FROM_ as in_index_since,
-                ISNULL(B.THRU, '{until}') as in_index_until,
-                B.iid as iid,
-                B.gvkey as gvkey,
-                B.gvkeyx
-            from dbo.CSIdxCstHisSnP B		
-                where 
-                    B.GVKEYX in ('000003','118341')
-                    AND ISNULL(B.THRU, '{until}') >= '{since}'
-            """.format(since=since.strftime(DATE_STRING_FORMAT_QAD),
-                           until=until.strftime(DATE_STRING_FORMAT_QAD))
-        # then Rest of World
-        ROW_query_current = """
+        # US and Canadian index members, then Rest of World, history and current tables for each.
+        # All four are fetched in a single round trip
+        tables = [('dbo.CSIdxCstHisSnP', "'000003','118341'"),
+                  ('dbo.CSIdxCstHis', "'000003','118341'"),
+                  ('CSGIdxCstHisSnP', "'150918'"),
+                  ('CSGIdxCstHis', "'150918'")]
+        query = "\n            UNION ALL".join("""
             SELECT
                 B.FROM_ as in_index_since,
-                ISNULL(B.THRU, '{until}') as in_index_until,
+                ISNULL(B.THRU, ?) as in_index_until,
                 B.iid as iid,
                 B.gvkey as gvkey,
                 B.gvkeyx
-            from CSGIdxCstHis B 
+            from {table} B
                 where 
-                    B.GVKEYX in ('150918')
-                    AND ISNULL(B.THRU, '{until}') >= '{since}'
-            """.format(since=since.strftime(DATE_STRING_FORMAT_QAD),
-                       until=until.strftime(DATE_STRING_FORMAT_QAD))
-        ROW_query_history = """
-            SELECT
-                B.FROM_ as in_index_since,
-                ISNULL(B.THRU, '{until}') as in_index_until,
-                B.iid as iid,
-                B.gvkey as gvkey,
-                B.gvkeyx
-            from CSGIdxCstHisSnP B
-                where 
-                    B.GVKEYX in ('150918')
-                    AND ISNULL(B.THRU, '{until}') >= '{since}'
-            """.format(since=since.strftime(DATE_STRING_FORMAT_QAD),
-                       until=until.strftime(DATE_STRING_FORMAT_QAD))
-        # concat the four queries together
-        result = pd.concat([self.query(NA_query_history), self.query(NA_query_current),
-                            self.query(ROW_query_history), self.query(ROW_query_current)])
+                    B.GVKEYX in ({gvkeyxs})
+                    AND ISNULL(B.THRU, ?) >= ?
+            """.format(table=table, gvkeyxs=gvkeyxs) for table, gvkeyxs in tables)
+        since = since.strftime(DATE_STRING_FORMAT_QAD)
+        until = until.strftime(DATE_STRING_FORMAT_QAD)
+        # each branch of the UNION ALL binds until, until and since in that order
+        result = self.query(query, params=[until, until, since] * len(tables),
+                            parse_dates=['in_index_since', 'in_index_until'])
         result['gvkey'] = result.gvkey.astype(str).str.zfill(6)
         result['gvkeyx'] = result.gvkeyx.astype(str).str.zfill(6)
-        result['in_index_since'] = pd.to_datetime(result['in_index_since'])
-        result['in_index_until'] = pd.to_datetime(result['in_index_until'])
         return result
 
     def security_name_QAD_master_table(self, cusip, sedol):
-        if len(sedol) == 0:
-            sedol = ['']
-        if len(cusip) == 0:
-            cusip = ['']
-        query = """
+        query = """{matched_securities}
         SELECT distinct 
-            name as issuer_name,
-		    CASE WHEN mastX.cusip IS NOT NULL THEN
-			    CASE
-				    WHEN mastX.cusip IN({cusips}) THEN mastX.cusip
-			    ELSE mastX.prevcusip END 
-		    ELSE
-			    CASE
-				    WHEN mastX.sedol IN({sedols}) THEN mastX.sedol
-			    ELSE mastX.prevSedol END
-		    END AS security_key_abbrev,
-		    CASE 
-                WHEN mastX.cusip IS NOT NULL THEN 'cusip' 
-                ELSE 'sedol'
-            END AS security_key_name
+            mastX.name as issuer_name,
+		    matched.security_key_abbrev,
+		    matched.security_key_name
         from vw_SecurityMasterX mastX
-            WHERE    ((mastX.sedol IN ({sedols}) OR mastX.prevsedol IN ({sedols}) )
-            OR (mastX.cusip IN ({cusips}) OR mastX.prevcusip IN ({cusips}))
-                )""".format(cusips=",".join(["'{}'".format(i) for i in cusip]),
-                            sedols=",".join(["'{}'".format(i) for i in sedol]))
+            INNER JOIN matched
+                ON matched.seccode = mastX.seccode
+                AND matched.typ = mastX.typ
+        """.format(matched_securities=self._matched_securities_cte(cusip, sedol))
         return self.query(query)
 
     def security_ISIN_QAD_master_table(self, cusip, sedol):
-        if len(sedol) == 0:
-            sedol = ['']
-        if len(cusip) == 0:
-            cusip = ['']
-        query = """
+        query = """{matched_securities}
         SELECT distinct 
-            isin as issuer_ISIN,
-		    CASE WHEN mastX.cusip IS NOT NULL THEN
-			    CASE
-				    WHEN mastX.cusip IN({cusips}) THEN mastX.cusip
-			    ELSE mastX.prevcusip END 
-		    ELSE
-			    CASE
-				    WHEN mastX.sedol IN({sedols}) THEN mastX.sedol
-			    ELSE mastX.prevSedol END
-		    END AS security_key_abbrev,
-		    CASE 
-                WHEN mastX.cusip IS NOT NULL THEN 'cusip' 
-                ELSE 'sedol'
-            END AS security_key_name
-        
+            mastX.isin as issuer_ISIN,
+		    matched.security_key_abbrev,
+		    matched.security_key_name
         from vw_SecurityMasterX mastX
-
-        WHERE    ((mastX.sedol IN ({sedols}) OR mastX.prevsedol IN ({sedols}) )
-            OR (mastX.cusip IN ({cusips}) OR mastX.prevcusip IN ({cusips}))
-                )""".format(cusips=",".join(["'{}'".format(i) for i in cusip]),
-                            sedols=",".join(["'{}'".format(i) for i in sedol]))
+            INNER JOIN matched
+                ON matched.seccode = mastX.seccode
+                AND matched.typ = mastX.typ
+        """.format(matched_securities=self._matched_securities_cte(cusip, sedol))
         return self.query(query)
 
     def get_worldscope_feature(self, panel, feature_name, feature_code, period='A',
@@ -1623,35 +1545,89 @@ class QAD(SqlReader):
                             - If given, replaces the column name with this string with the `feature_name`
         :returns: A minimal copy of the panel with ['security_key_name','security_key', 'date', `feature_name`]
         """
-        df = panel[panel.features.unit_key + panel.features.time_key].copy()
-        if is_security_level:
-            worldscope_key = 'worldscope_security_key'
-            df = self.worldscope_security_key(df)
-        else:
-            worldscope_key = 'worldscope_key'
-            df = self.worldscope_key(df)
-
-        df.loc[df[worldscope_key].isna(), worldscope_key] = "-99"
-
-        worldscope_keys = df[~df[worldscope_key].isna()
-                             ][worldscope_key].unique()
+        return self._add_worldscope_features(panel, [(feature_name, feature_code, db_column_name)], period=period,
+                                             exact_match_allowed=exact_match_allowed,
+                                             convert_currency=convert_currency, is_security_level=is_security_level)
 
-        feature = self.worldscope_add_last_actual(
-            worldscope_keys, period=period, metric_code=feature_code, exact_match_allowed=exact_match_allowed)
-        feature = feature.rename(columns={'worldscope_key': worldscope_key})
-
-        if db_column_name is not None:
-            feature.rename(
-                columns={db_column_name: feature_name}, inplace=True)
-
-        df = df.features._asof_merge_feature(feature,
-                                             feature_name,
-                                             on=df.features.time_key,
-                                             by=[worldscope_key],
-                                             exact_match_allowed=exact_match_allowed)
+    def get_worldscope_features(self, panel, features, period='A', exact_match_allowed=True, convert_currency=True,
+                                is_security_level=False, max_workers=_WORLDSCOPE_FEATURE_WORKERS):
+        """
+        Adds several worldscope features to a minimal copy of the panel, as get_worldscope_feature does for one. The
+        Worldscope mapping is looked up once and the features are queried concurrently, each on its own connection.
 
-        if convert_currency:
-            df = df.units.convert_currency_aware_column(
-                metric=feature_name, exact_day_match=True)
+        :param panel: Pandas Dataframe
+                    Panel object conforming to panel tool object standards
+        :param features: dict
+                    Maps the column name of each added feature to its Worldscope item code,
+                    e.g. {'funds_from_operations': 4201, 'capital_expenditures': 4601}
+        :param period: str, default 'A'
+                    period type (NOT pandas standard) to retrive from,
+                    either annual type ['A','B','G'] or quarterly type ["E","Q","H","I","R","@"]
+        :param exact_match_allowed: bool, default True
+                    - If True, allow matching with the same 'on' value
+                      (i.e. less-than-or-equal-to / greater-than-or-equal-to)
+                    - If False, don't match the same 'on' value
+                      (i.e., strictly less-than / strictly greater-than).
+        :param convert_currency: bool, default True
+                            - If True, convert added features' currency to `to_currency`
+                            - If False, keep as currency aware objects (XMoney)
+        :param is_security_level: bool, default False
+                            - If True, uses security level keys to join the features on the panel
+                            - If False, uses company level keys to join the features on the panel
+        :param max_workers: int, default 8
+                    Most queries run at once
+        :returns: A minimal copy of the panel with ['security_key_name','security_key', 'date'] and the feature columns
+        """
+        return self._add_worldscope_features(panel, [(name, code, None) for name, code in features.items()],
+                                             period=period, exact_match_allowed=exact_match_allowed,
+                                             convert_currency=convert_currency, is_security_level=is_security_level,
+                                             max_workers=max_workers)
+
+    def _add_worldscope_features(self, panel, features, period, exact_match_allowed, convert_currency,
+                                 is_security_level, max_workers=1):
+        """Shared body of get_worldscope_feature(s), `features` is a list of (feature_name, feature_code,
+        db_column_name) tuples."""
+        unit_key, time_key = panel.features.unit_key, panel.features.time_key
+        # selecting the columns already gives a fresh copy, and still raises if the panel is missing a key column
+        df = panel[unit_key + time_key]
+        worldscope_key = 'worldscope_security_key' if is_security_level else 'worldscope_key'
+        mapping = self._worldscope_mapping(df, is_security_level=is_security_level)
+        df = pd.merge(df, mapping, on='security_key_abbrev', how='left')
+        df[worldscope_key] = df[worldscope_key].fillna("-99")
+
+        # take the distinct keys from the one row per security mapping rather than the full panel
+        worldscope_keys = pd.unique(mapping[worldscope_key].to_numpy())
+        if len(worldscope_keys) == 0:
+            # nothing in the panel maps to Worldscope, so there is nothing to query
+            for feature_name, _, _ in features:
+                df[feature_name] = np.nan
+            return df.drop(columns=['security_key_abbrev', worldscope_key])
+
+        item_names = self.worldscope_item_name_dictionary()
+
+        def fetch(feature_name, feature_code, db_column_name):
+            if db_column_name is None:
+                db_column_name = clean_string(item_names[feature_code])
+            return self.worldscope_add_last_actual(
+                worldscope_keys, period=period, metric_code=feature_code, exact_match_allowed=exact_match_allowed,
+                column_names={'worldscope_key': worldscope_key, db_column_name: feature_name})
+
+        if len(features) == 1 or max_workers == 1:
+            fetched = [fetch(*feature) for feature in features]
+        else:
+            # every query is a separate round trip, and pyodbc releases the GIL while waiting on the server
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(features))) as executor:
+                fetched = list(executor.map(lambda feature: fetch(*feature), features))
+
+        for (feature_name, _, _), feature in zip(features, fetched):
+            df = df.features._asof_merge_feature(feature,
+                                                 feature_name,
+                                                 on=time_key,
+                                                 by=[worldscope_key],
+                                                 exact_match_allowed=exact_match_allowed)
+
+            if convert_currency:
+                df = df.units.convert_currency_aware_column(
+                    metric=feature_name, exact_day_match=True)
 
         return df.drop(columns=['security_key_abbrev', worldscope_key])
@@ -1,5 +1,6 @@
 import importlib
 import logging
+import threading
 from functools import wraps
 from .config import enabled_modules
 
@@ -37,13 +38,20 @@ def import_class(name, module, package=None):
 
 
 def import_ctrlaltdata_module(name, module, package=None):
+    """
+    Passes class `name` from a ctrlaltdata submodule to the decorated function, or None if the submodule is not
+    enabled. The submodule is only imported the first time the function is called, so importing ctrlaltdata does not
+    pull in database drivers for sources that are never used.
+    """
+    enabled = module.split('.')[-2] in enabled_modules
     cls = None
-    if module.split('.')[-2] in enabled_modules:
-        cls = getattr(importlib.import_module(module, package), name)
 
     def inner(func):
         @wraps(func)
         def inner_import_module(*args, **kwargs):
+            nonlocal cls
+            if enabled and cls is None:
+                cls = getattr(importlib.import_module(module, package), name)
             args = list(args)
             args.append(cls)
             return func(*args, **kwargs)
@@ -51,18 +59,43 @@ def import_ctrlaltdata_module(name, module, package=None):
     return inner
 
 
+# the single instance of each Borg subclass
+_instances = {}
+
+
 class Borg:
-    _shared_state = {}
-    def __init__(self):
-        self.__dict__ = self._shared_state
+    """
+    Every instantiation of a subclass returns the same instance of that subclass, so state set through one handle is
+    seen through all of them, and different subclasses never share state.
+    """
+    def __new__(cls, *args, **kwargs):
+        instance = _instances.get(cls)
+        if instance is None:
+            # setdefault keeps the first instance if two threads get here at once
+            instance = _instances.setdefault(cls, super().__new__(cls))
+        return instance
 
 
 class ResourceManager(Borg):
     # [TODO: refactor resource manager to move methods to their own modules.]
+    _lock = threading.Lock()
+
     def __init__(self):
-        Borg.__init__(self)
-        if not hasattr(self, "resources"):
-            self.resources = dict()
+        # __init__ runs on every ResourceManager(), setdefault keeps the resources already created
+        self.__dict__.setdefault("resources", dict())
+
+    def _get_resource(self, key, factory):
+        """
+        Returns the shared resource stored under `key`, creating it with `factory` on first use. The lock is only
+        taken when the resource does not exist yet, so concurrent first calls create a single instance.
+        """
+        resource = self.resources.get(key)
+        if resource is None:
+            with self._lock:
+                resource = self.resources.get(key)
+                if resource is None:
+                    resource = self.resources[key] = factory()
+        return resource
 
     if __package__:
         context = __package__
@@ -74,34 +107,20 @@ class ResourceManager(Borg):
     def qad(self, QAD):
         if QAD is None:
             raise ModuleNotEnabledException('qad')
-        if "qad" not in self.resources: ## Warning this is not thread safe
-            qad = QAD()
-            self.resources["qad"] = qad
-        else:
-            qad = self.resources["qad"]
-        return qad
+        return self._get_resource("qad", QAD)
 
     @property
     @import_ctrlaltdata_module("Compustat", module=f"{context}.compustat.compustat")
     def compustat(self, Compustat):
         if Compustat is None:
             raise ModuleNotEnabledException('compustat')
-        if "compustat" not in self.resources:  ## Warning this is not thread safe
-            compustat = Compustat()
-            self.resources["compustat"] = compustat
-        else:
-            compustat = self.resources["compustat"]
-        return compustat
+        return self._get_resource("compustat", Compustat)
 
     @property
     @import_ctrlaltdata_module("FredReader", module=f"{context}.fred.fred")
     def fred(self, FredReader):
         if FredReader is None:
             raise ModuleNotEnabledException('fred')
-        if "fred" not in self.resources:  ## Warning this is not thread safe
-            fred = FredReader()
-            self.resources["fred"] = fred
-        else:
-            fred = self.resources["fred"]
+        fred = self._get_resource("fred", FredReader)
         logging.warning("The use of Fred module is intended for non-commercial purposes only.")
         return fred
@@ -1,6 +1,7 @@
 import unittest
 import pandas as pd
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 from ...api import BaseFeaturesAccessor
 from ...panel_constructors import get_sp_500_panel, get_sp_1200_panel
@@ -9,16 +10,19 @@ from ...config import enabled_modules
 
 
 class TestAPI(unittest.TestCase):
-    def setUp(self):
-        self.objs = {}
-        self.until = pd.to_datetime(datetime.datetime.now())
-        self.since = self.until - pd.tseries.offsets.MonthEnd(3)
+    @classmethod
+    def setUpClass(cls):
+        # the panels are queried once for the whole class, each test works on its own copy
+        cls.panels = {}
+        cls.until = pd.to_datetime(datetime.datetime.now())
+        cls.since = cls.until - pd.tseries.offsets.MonthEnd(3)
         if 'qad' in enabled_modules:
-            df_sp_1200 = get_sp_1200_panel(since=self.since, until=self.until)
-            self.objs['qad'] = BaseFeaturesAccessor(df_sp_1200)
+            cls.panels['qad'] = get_sp_1200_panel(since=cls.since, until=cls.until)
         if 'compustat' in enabled_modules:
-            df_sp_500 = get_sp_500_panel(since=self.since, until=self.until, source='compustat')
-            self.objs['compustat'] = BaseFeaturesAccessor(df_sp_500)
+            cls.panels['compustat'] = get_sp_500_panel(since=cls.since, until=cls.until, source='compustat')
+
+    def setUp(self):
+        self.objs = {source: BaseFeaturesAccessor(df.copy()) for source, df in self.panels.items()}
         self.missingness_tolerance = 0.1
 
     def test_init(self):
@@ -56,9 +60,8 @@ class TestAPI(unittest.TestCase):
         def check_keys(key_dict, key_col, panel):
             for key in keys:
                 assert key in key_dict.keys()
-                assert all([x in key_dict[key] for x in panel._obj.loc[panel._obj['security_key_name'] == key,
-                                                                          key_col].unique()]
-                          )
+                assert set(panel._obj.loc[panel._obj['security_key_name'] == key, key_col].unique()).issubset(
+                    key_dict[key])
         for panel in self.objs.values():
             unabbreviated_keys = panel._get_keys()
             check_keys(unabbreviated_keys, 'security_key', panel)
@@ -66,8 +69,11 @@ class TestAPI(unittest.TestCase):
             panel._obj = panel._obj.drop(columns=['security_key_abbrev'])
             abbreviated_keys = panel._get_keys(abbreviated=True)
             assert 'security_key_abbrev' in panel._obj.columns
-            assert (panel._obj.loc[panel._obj['security_key_name'] == "cusip", 'security_key_abbrev'].str.len() == 8).all()
-            assert (panel._obj.loc[panel._obj['security_key_name'] == "sedol", 'security_key_abbrev'].str.len() == 6).all()
+            # abbreviations repeat across dates, so check the length of each distinct one
+            for key_name, abbrev_length in [('cusip', 8), ('sedol', 6)]:
+                abbrevs = pd.Series(panel._obj.loc[panel._obj['security_key_name'] == key_name,
+                                                   'security_key_abbrev'].unique())
+                assert (abbrevs.str.len() == abbrev_length).all()
             check_keys(abbreviated_keys, 'security_key_abbrev', panel)
 
             # panel without cusip/sedol
@@ -82,9 +88,9 @@ class TestAPI(unittest.TestCase):
         for panel in self.objs.values():
             feature_name = 'two_digit_key'
             shifted_panel = panel._obj[['security_key_name', 'security_key', 'date']].copy()
-            shifted_panel[feature_name] = shifted_panel['security_key'].str[:2].copy()
+            shifted_panel[feature_name] = shifted_panel['security_key'].str[:2]
             shifted_panel['date'] = shifted_panel['date'] - datetime.timedelta(days=1)
-            shifted_panel['shifted_date'] = shifted_panel['date'].copy()
+            shifted_panel['shifted_date'] = shifted_panel['date']
 
             panel._obj[feature_name] = None
             as_of_merged_panel = panel._asof_merge_feature(shifted_panel, feature_name)
@@ -106,13 +112,12 @@ class TestAPI(unittest.TestCase):
             assert 'security_key_prefix' in temp.columns
 
     def test_methods(self):
+        methods = self.generate_test_methods()
         for source in self.objs.keys():
             panel = self.objs[source]._obj
-            methods = self.generate_test_methods()
-            columns = list(panel.columns)
-            for method_name in methods:
-                self.check_feature(method_name, panel, source)
-                panel = panel[columns]
+            # each feature is its own round trip, so check them concurrently, each on a fresh copy of the panel
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(lambda method_name: self.check_feature(method_name, panel.copy(), source), methods))
 
     def generate_test_methods(self):
         invalid_objects = ['supported_keys', 'time_key', 'unit_key', 'add_feature', 'gvkey']
@@ -121,14 +126,13 @@ class TestAPI(unittest.TestCase):
         return valid_method_names
 
     def check_feature(self, method_name, panel, source):
-        print("testing method: ", method_name)
+        print(f'testing method: {method_name}')
         method = getattr(panel.features, method_name)
         if callable(method):
             try:
                 panel = method(source=source)
             except TypeError as e:
-                print(f'error: {e}')
-                print(f'{method}')
+                print(f'{method_name} error: {e}\n{method}')
             # check that feature is added
             assert method_name in panel.columns
 
@@ -136,11 +140,11 @@ class TestAPI(unittest.TestCase):
             expected_incomplete = []
             if method_name not in expected_incomplete:
                 self.check_feature_missingness(panel, method_name)
-            print("panel columns: ", panel.columns)
+            print(f'{method_name} panel columns: {list(panel.columns)}')
 
     def check_feature_missingness(self, panel, feature):
-        assert (len(panel[panel.in_index == 1][panel[feature].isna()]) / len(
-            panel[panel.in_index == 1])) < self.missingness_tolerance
+        in_index = panel['in_index'] == 1
+        assert (panel[feature].isna() & in_index).sum() / in_index.sum() < self.missingness_tolerance
 
 
 if __name__ == '__main__':
@@ -1,5 +1,6 @@
 import unittest
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 
 from ....api import get_sp_500_panel, get_sp_1500_panel
@@ -7,22 +8,26 @@ from ....compustat.api import Features
 
 
 class TestAPI(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # the panels are queried once for the whole class, each test works on its own copy
+        cls.until = pd.to_datetime(datetime.datetime.now())
+        cls.since = cls.until - pd.tseries.offsets.MonthEnd(4)
+        df_sp_500 = get_sp_500_panel(since=cls.since, until=cls.until)
+        df_sp_1500 = get_sp_1500_panel(since=cls.since, until=cls.until)
+        cls.panels = {'sp_500': df_sp_500, 'sp_1500': df_sp_1500}
+
     def setUp(self):
-        self.until = pd.to_datetime(datetime.datetime.now())
-        self.since = self.until - pd.tseries.offsets.MonthEnd(4)
-        df_sp_500 = get_sp_500_panel(since=self.since, until=self.until)
-        df_sp_1500 = get_sp_1500_panel(since=self.since, until=self.until)
-        self.dfs = {'sp_500': df_sp_500, 'sp_1500': df_sp_1500}
+        self.dfs = {name: df.copy() for name, df in self.panels.items()}
         self.missingness_tolerance = 0.1
 
     def test_methods(self):
+        methods = self.generate_test_methods()
         for panel_name in self.dfs.keys():
             panel = self.dfs[panel_name]
-            methods = self.generate_test_methods()
-            columns = list(panel.columns)
-            for method_name in methods:
-                self.check_feature(method_name, panel)
-                panel = panel[columns]
+            # each feature is its own round trip, so check them concurrently, each on a fresh copy of the panel
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(lambda method_name: self.check_feature(method_name, panel.copy()), methods))
 
     @staticmethod
     def generate_test_methods():
@@ -32,14 +37,13 @@ class TestAPI(unittest.TestCase):
         return valid_method_names
 
     def check_feature(self, method_name, panel):
-        print("testing method: ", method_name)
+        print(f'testing method: {method_name}')
         method = getattr(panel.features, method_name)
         if callable(method):
             try:
                 panel = method()
             except TypeError as e:
-                print(f'error: {e}')
-                print(f'{method}')
+                print(f'{method_name} error: {e}\n{method}')
             # check that feature is added
             assert method_name in panel.columns
 
@@ -47,15 +51,15 @@ class TestAPI(unittest.TestCase):
             expected_incomplete = ['ipo_date']
             if method_name not in expected_incomplete:
                 self.check_feature_missingness(panel, method_name)
-            print("panel columns: ", panel.columns)
+            print(f'{method_name} panel columns: {list(panel.columns)}')
 
     def check_feature_missingness(self, panel, feature):
+        in_index = panel['in_index'] == 1
         if 'return' in feature:
             # 'returns' functions will fail missing value test because
             # they are not calculated for the first panel date
-            panel = panel[panel['date'] > panel['date'].min()]
-        assert (len(panel[panel.in_index == 1][panel[feature].isna()]) / len(
-            panel[panel.in_index == 1])) < self.missingness_tolerance
+            in_index &= panel['date'] > panel['date'].min()
+        assert (panel[feature].isna() & in_index).sum() / in_index.sum() < self.missingness_tolerance
 
 
 if __name__ == '__main__':
@@ -28,8 +28,9 @@ class TestCompustat(unittest.TestCase):
 
         assert result.date.min() >= self.since
         assert result.date.max() <= self.until
-        assert len(result.date.unique()) > 0
-        assert len(result.date.unique()) <= (self.until - self.since).days
+        n_dates = result.date.nunique()
+        assert n_dates > 0
+        assert n_dates <= (self.until - self.since).days
         assert 'capex' in result.columns
 
 
@@ -2,12 +2,22 @@ import unittest
 import io
 import sys
 import pyodbc
+import pandas as pd
 
-from ...database import SqlReader
+from ...database import SqlReader, sql_in_list, _SQL_IN_LIST_WARNING_SIZE
 from ...config import QAD_CONNECTION_STRING
 
 
 class TestDatabase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # one connection for the class, the tests run one after another so it is never used concurrently
+        cls.qad_connection = pyodbc.connect(QAD_CONNECTION_STRING)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.qad_connection.close()
+
     def setUp(self):
         self.obj = SqlReader()
     
@@ -15,7 +25,7 @@ class TestDatabase(unittest.TestCase):
         assert self.obj.connection is None
     
     def test_query(self):
-        self.obj.connection = pyodbc.connect(QAD_CONNECTION_STRING)
+        self.obj.connection = self.qad_connection
         test_query = "SELECT  TOP 5 * FROM TreCode"
         capturedOutput = io.StringIO()
         sys.stdout = capturedOutput
@@ -23,11 +33,42 @@ class TestDatabase(unittest.TestCase):
         assert not result.empty
         assert capturedOutput.getvalue().strip() == test_query.strip()
     
+    def test_query_chunksize(self):
+        self.obj.connection = self.qad_connection
+        test_query = "SELECT  TOP 5 * FROM TreCode ORDER BY 1"
+        result = self.obj.query(test_query)
+        chunked_result = self.obj.query(test_query, chunksize=2)
+        pd.testing.assert_frame_equal(chunked_result, result)
+
+    def test_upload_keys(self):
+        self.obj.connection = self.qad_connection
+        # trailing spaces compare equal in SQL Server, so these are two keys once loaded, and loading does not fail
+        loaded = self.obj.upload_keys('#test_keys', ['X1', 'X1 ', 'Y2', 'Y2', None])
+        assert loaded == 2
+        result = self.obj.query("SELECT k FROM #test_keys")
+        assert len(result) == 2
+
     def test_get_tables(self):
-        self.obj.connection = pyodbc.connect(QAD_CONNECTION_STRING)
+        self.obj.connection = self.qad_connection
         result = self.obj.get_tables()
         assert not result.empty
 
 
+class TestSqlInList(unittest.TestCase):
+    def test_sorted_and_deduplicated(self):
+        assert sql_in_list(['b', 'a', 'b', 3]) == "'3','a','b'"
+        assert sql_in_list(['b', 'a']) == sql_in_list(['a', 'b', 'a'])
+
+    def test_empty(self):
+        assert sql_in_list([]) == "''"
+
+    def test_warns_above_threshold(self):
+        items = [str(i) for i in range(_SQL_IN_LIST_WARNING_SIZE + 1)]
+        with self.assertLogs(level='WARNING') as logs:
+            sql_in_list(items)
+        assert len(logs.output) == 1
+        assert str(len(items)) in logs.output[0]
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -7,11 +7,16 @@ from ....fred.api import Features
 
 
 class TestAPI(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # the panel is queried once for the whole class, each test works on its own copy
+        cls.until = pd.to_datetime(datetime.datetime.now())
+        cls.since = cls.until - pd.tseries.offsets.MonthEnd(4)
+        cls.panel = get_security_panel(since=cls.since, until=cls.until, frequency='BM',
+                                       cusips=[str(i) for i in range(50)])
+
     def setUp(self):
-        self.until = pd.to_datetime(datetime.datetime.now())
-        self.since = self.until - pd.tseries.offsets.MonthEnd(4)
-        self.df = get_security_panel(since=self.since, until=self.until, frequency='BM',
-                                     cusips=[str(i) for i in range(50)])
+        self.df = self.panel.copy()
 
     def test_get_fred_feature(self):
         fred_feature = self.df.features._get_fred_feature('ICSA')
@@ -21,7 +26,9 @@ class TestAPI(unittest.TestCase):
     def test_return_fred_feature(self):
         fred_feature = self.df.features._get_fred_feature('ICSA')
         fred_feature_pit = self.df.features._return_fred_feature(fred_feature)
-        assert (fred_feature_pit.groupby('date')['period_date'].count() == 1).all()
+        # exactly one point in time period per date
+        assert not fred_feature_pit['date'].duplicated().any()
+        assert fred_feature_pit['period_date'].notna().all()
 
     def test_search_fred(self):
         assert self.df.features.search_fred('doesnotexist') is None
@@ -27,7 +27,7 @@ class TestAPI(unittest.TestCase):
                                                         index_code=index_code_valid, keep_in_index_only=True)
 
         assert index_panel_ftse100.shape[0] > 0
-        assert index_panel_ftse100[index_panel_ftse100['in_index'] == 0].shape[0] == 0
+        assert not (index_panel_ftse100['in_index'] == 0).any()
 
         # Case with correct index_name and no index_code
         index_panel_ftse_all_share = get_index_from_datastream(self.since, self.until, frequency='M',
@@ -1,52 +1,101 @@
 import logging
 import unittest
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 
 from ....panel_constructors import (get_sp_500_panel,
                                     get_sp_1200_panel)
 from ....qad.api import Features
 from ....util import cusip_abbrev_to_full
+from ....resource import ResourceManager
 
 from ....import api
 
     
 class TestAPI(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # the panels are queried once for the whole class, each test works on its own copy
+        cls.until = pd.to_datetime(datetime.datetime.now())
+        cls.since = cls.until - pd.tseries.offsets.MonthEnd(3)
+        df_sp_500 = get_sp_500_panel(since=cls.since, until=cls.until)# default monthly
+        df_sp_1200 = get_sp_1200_panel(since=cls.since, until=cls.until)
+        cls.panels = {'sp_500': df_sp_500, 'sp_1200': df_sp_1200}
+
     def setUp(self):
-        self.until = pd.to_datetime(datetime.datetime.now())
-        self.since = self.until - pd.tseries.offsets.MonthEnd(3)
-        df_sp_500 = get_sp_500_panel(since=self.since, until=self.until)# default monthly
-        df_sp_1200 = get_sp_1200_panel(since=self.since, until=self.until)
-        self.dfs = {'sp_500': df_sp_500, 'sp_1200': df_sp_1200}
+        self.dfs = {name: df.copy() for name, df in self.panels.items()}
         self.missingness_tolerance = 0.1
 
     def test_methods(self):
+        methods = self.generate_test_methods()
         for panel_name in self.dfs.keys():
             panel = self.dfs[panel_name]
-            methods = self.generate_test_methods(panel)
-            columns = list(panel.columns)
-            for method_name in methods:
-                self.check_feature(method_name, panel_name, panel)
-                panel = panel[columns]
+            # each feature is its own round trip, so check them concurrently, each on a fresh copy of the panel
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(lambda method_name: self.check_feature(method_name, panel_name, panel.copy()),
+                                  methods))
 
     def test_exchange_rate(self):
         for panel in self.dfs.values():
-            temp = panel.copy()
-            temp = temp.features.exchange_rate(from_currency='USD',
-                                               to_currency='GBP')
+            temp = panel.features.exchange_rate(from_currency='USD',
+                                                to_currency='GBP')
             assert 'exchange_rate' in temp.columns
             self.check_feature_missingness(temp, 'exchange_rate')
 
     def test_ibes_actuals(self):
         for panel in self.dfs.values():
-            temp = panel.copy()
             metric_name = 'sales'
-            temp = temp.features.ibes_actuals(metric_name, period_type=4)
+            temp = panel.features.ibes_actuals(metric_name, period_type=4)
             assert metric_name in temp.columns
             self.check_feature_missingness(temp, metric_name)
     
+    def test_get_worldscope_features(self):
+        qad = ResourceManager().qad
+        features = {'funds_from_operations': 4201, 'capital_expenditures': 4601}
+        for panel in self.dfs.values():
+            keys = panel.features.unit_key + panel.features.time_key
+            combined = qad.get_worldscope_features(panel, features)
+            assert set(combined.columns) == set(keys) | set(features)
+            for feature_name, feature_code in features.items():
+                single = qad.get_worldscope_feature(panel, feature_name=feature_name, feature_code=feature_code)
+                assert set(single.columns) == set(keys) | {feature_name}
+                merged = combined.merge(single, on=keys, suffixes=('', '_single'))
+                assert len(merged) == len(single)
+                pd.testing.assert_series_equal(merged[feature_name], merged[f'{feature_name}_single'],
+                                               check_names=False)
+
+    def test_get_worldscope_actuals_for_cusips(self):
+        qad = ResourceManager().qad
+        columns = ['worldscope_key', 'date', 'fiscal_period_end_date', 'cash___generic']
+        for panel in self.dfs.values():
+            keys = panel.features._get_keys(abbreviated=True)
+            fused = qad.get_worldscope_actuals_for_cusips(period='A', metric_code=2005, **keys)
+            # the fused query must give the same reports as mapping to company codes and querying those
+            codes = qad.get_worldscope_company_code(**keys).worldscope_key.astype(str).unique()
+            separate = qad.get_worldscope_actuals('A', 2005, codes)
+            assert set(fused.security_key_abbrev) <= set(keys['cusip']) | set(keys['sedol'])
+            fused = fused[columns].drop_duplicates().sort_values(columns[:3]).reset_index(drop=True)
+            separate = separate[columns].drop_duplicates().sort_values(columns[:3]).reset_index(drop=True)
+            pd.testing.assert_frame_equal(fused, separate, check_dtype=False)
+
+    def test_cash_and_equivalents(self):
+        qad = ResourceManager().qad
+        for panel in self.dfs.values():
+            keys = panel.features.unit_key + panel.features.time_key
+            result = qad.cash_and_equivalents(panel.copy())
+            assert 'cash_and_equivalents' in result.columns
+            assert 'worldscope_key' not in result.columns
+            self.check_feature_missingness(result, 'cash_and_equivalents')
+            # the QAD method and the panel feature merge per company code, so they agree row for row
+            expected = panel.copy().features.cash_and_equivalents()
+            columns = keys + ['cash_and_equivalents']
+            result = result[columns].sort_values(columns).reset_index(drop=True)
+            expected = expected[columns].sort_values(columns).reset_index(drop=True)
+            pd.testing.assert_frame_equal(result, expected)
+
     @staticmethod
-    def generate_test_methods(panel):
+    def generate_test_methods():
         broken = ['returns',  # requires analysis accessor
          'last_fiscal_end_dates',  # uses wrong date column on main dataframe
          'excess_return'  # too many NaN features ~ 13% allowed 10%
@@ -62,14 +111,13 @@ class TestAPI(unittest.TestCase):
     def check_feature(self, method_name, panel_name, panel):
         us_only_features = ['sp_500_market_weight', 'sp_1500_market_weight', 'tickers']
         if not (panel_name == 'sp_1200' and method_name in us_only_features):
-            print("testing method: ", method_name)
+            print(f'testing method: {method_name}')
             method = getattr(panel.features, method_name)
             if callable(method):
                 try:
                     panel = method()
                 except TypeError as e:
-                    print(f'error: {e}')
-                    print(f'{method}')
+                    print(f'{method_name} error: {e}\n{method}')
                 # check that feature is added
                 assert method_name in panel.columns
 
@@ -77,11 +125,11 @@ class TestAPI(unittest.TestCase):
                 expected_incomplete = ['merger_target_next_announce_date', 'gross_profit_margin']
                 if method_name not in expected_incomplete:
                     self.check_feature_missingness(panel, method_name)
-                print("panel columns: ", panel.columns)
+                print(f'{method_name} panel columns: {list(panel.columns)}')
 
     def check_feature_missingness(self, panel, feature):
-        assert (len(panel[panel.in_index == 1][panel[feature].isna()]) / len(
-            panel[panel.in_index == 1])) < self.missingness_tolerance
+        in_index = panel['in_index'] == 1
+        assert (panel[feature].isna() & in_index).sum() / in_index.sum() < self.missingness_tolerance
 
 
 if __name__ == '__main__':
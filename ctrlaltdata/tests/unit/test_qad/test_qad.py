@@ -5,16 +5,19 @@ import pandas as pd
 
 from ....qad.qad import QAD
 from ....util import cusip_abbrev_to_full, NotInitializedException
+from ....config import DATE_STRING_FORMAT_QAD
 
 
 class TestQAD(unittest.TestCase):
-    def setUp(self):
-        self.since = (datetime.datetime.now() - pd.tseries.offsets.MonthEnd(3)).date()
-        self.until = (datetime.datetime.now() - pd.tseries.offsets.MonthEnd()).date()
-        self.qad = QAD()
-        self.membership = self.qad.get_daily_sp_index_membership(since=self.since,
-                                                                 until=self.until)
-        self.cusips = cusip_abbrev_to_full(self.membership.security_key_abbrev.unique())
+    @classmethod
+    def setUpClass(cls):
+        # the membership query and check digits are computed once for the class, the tests only read them
+        cls.since = (datetime.datetime.now() - pd.tseries.offsets.MonthEnd(3)).date()
+        cls.until = (datetime.datetime.now() - pd.tseries.offsets.MonthEnd()).date()
+        cls.qad = QAD()
+        cls.membership = cls.qad.get_daily_sp_index_membership(since=cls.since,
+                                                               until=cls.until)
+        cls.cusips = cusip_abbrev_to_full(cls.membership.security_key_abbrev.unique())
 
     def test_init(self):
         if not self.qad:
@@ -36,13 +39,71 @@ class TestQAD(unittest.TestCase):
         assert len(membership.date.unique()) <= (self.until - self.since).days
 
         # sanity check securities
-        assert len(membership[membership.date == membership.date.max()].Cusip.unique()) >= 490
-        assert len(membership[membership.date == membership.date.max()].Cusip.unique()) <= 510
+        n_securities = membership.loc[membership.date == membership.date.max(), 'Cusip'].nunique()
+        assert n_securities >= 490
+        assert n_securities <= 510
 
         # sanity check data value coverage
-        assert len(membership[membership.index_weight.isna()]) == 0
-        assert len(membership[membership.in_index_since.isna()]) == 0
+        assert not membership.index_weight.isna().any()
+        assert not membership.in_index_since.isna().any()
 
+    def test_get_sp_market_weights(self):
+        cusips = self.membership.security_key_abbrev.unique()
+        keys = ['security_key_abbrev', 'security_key_name', 'date']
+        weights = self.qad.get_sp_market_weights(self.since, self.until, cusips)
+
+        # the 500 and 1500 weights come back in one frame, one row per security and date
+        assert set(weights.columns) == set(keys + ['sp_500_market_weight', 'sp_1500_market_weight'])
+        assert not weights.duplicated(keys).any()
+        assert weights.sp_500_market_weight.notna().any()
+        assert weights.sp_1500_market_weight.notna().any()
+
+        # each index column matches the raw IdxSpCmp rows for that index
+        for idx_code, column in [(203, 'sp_500_market_weight'), (555, 'sp_1500_market_weight')]:
+            raw = self.qad.query("""
+                SELECT S.Cusip as security_key_abbrev, N.Date_ as date, N."Weight" / 100 as market_weight
+                FROM qai.dbo.IdxSpCmp N
+                JOIN qai.PRC.IDXSEC S ON S.code = N.SecCode AND S.vendor = 1
+                WHERE N.IdxCode = ? AND N.Date_ >= ? AND N.Date_ <= ?
+                """, params=[idx_code, self.since.strftime(DATE_STRING_FORMAT_QAD),
+                                      self.until.strftime(DATE_STRING_FORMAT_QAD)])
+            raw = raw[raw.security_key_abbrev.isin(cusips)]
+            actual = weights.loc[weights[column].notna(), ['security_key_abbrev', 'date', column]]
+            assert set(map(tuple, actual[['security_key_abbrev', 'date']].to_numpy())) == \
+                set(map(tuple, raw[['security_key_abbrev', 'date']].to_numpy()))
+            # every pivoted weight is one of the raw weights for that security and date
+            merged = actual.merge(raw, on=['security_key_abbrev', 'date'])
+            matched = (merged[column] - merged['market_weight']).abs() < 1e-12
+            assert matched.groupby([merged.security_key_abbrev, merged.date]).any().all()
+
+
+class TestPivotSpMarketWeights(unittest.TestCase):
+    def test_duplicate_rows(self):
+        date = datetime.date(2020, 1, 31)
+        # the first security has two IDXSEC rows for the 500, the second is only in the 1500
+        long_weights = pd.DataFrame({'security_key_abbrev': ['AAA', 'AAA', 'AAA', 'BBB'],
+                                     'security_key_name': 'cusip',
+                                     'date': date,
+                                     'idx_code': [203, 203, 555, 555],
+                                     'market_weight': [0.01, 0.01, 0.002, 0.003]})
+        result = QAD._pivot_sp_market_weights(long_weights, (203, 555))
+        expected = pd.DataFrame({'security_key_abbrev': ['AAA', 'BBB'],
+                                 'security_key_name': 'cusip',
+                                 'date': date,
+                                 'sp_500_market_weight': [0.01, float('nan')],
+                                 'sp_1500_market_weight': [0.002, 0.003]})
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_index_missing_from_rows(self):
+        long_weights = pd.DataFrame({'security_key_abbrev': ['AAA'],
+                                     'security_key_name': 'cusip',
+                                     'date': datetime.date(2020, 1, 31),
+                                     'idx_code': [555],
+                                     'market_weight': [0.002]})
+        result = QAD._pivot_sp_market_weights(long_weights, (203, 555))
+        assert list(result.columns) == ['security_key_abbrev', 'security_key_name', 'date',
+                                        'sp_500_market_weight', 'sp_1500_market_weight']
+        assert result.sp_500_market_weight.isna().all()
 
 if __name__ == '__main__':
     unittest.main()
@@ -12,15 +12,18 @@ from ...config import enabled_modules
 
 
 class TestUnits(unittest.TestCase):
-    def setUp(self):
-        self.dfs = {}
-        self.until = pd.to_datetime(datetime.datetime.now())
-        self.since = self.until - pd.tseries.offsets.MonthEnd(3)
-        df_sp_500 = get_sp_500_panel(since=self.since, until=self.until)
-        self.dfs['sp_500'] = df_sp_500
+    @classmethod
+    def setUpClass(cls):
+        # the panels are queried once for the whole class, each test works on its own copy
+        cls.panels = {}
+        cls.until = pd.to_datetime(datetime.datetime.now())
+        cls.since = cls.until - pd.tseries.offsets.MonthEnd(3)
+        cls.panels['sp_500'] = get_sp_500_panel(since=cls.since, until=cls.until)
         if 'qad' in enabled_modules:
-            df_sp_1200 = get_sp_1200_panel(since=self.since, until=self.until)
-            self.dfs['sp_1200'] = df_sp_1200
+            cls.panels['sp_1200'] = get_sp_1200_panel(since=cls.since, until=cls.until)
+
+    def setUp(self):
+        self.dfs = {key: df.copy() for key, df in self.panels.items()}
         self.units_obj = {key: UnitsAccessor(self.dfs[key]) for key in self.dfs.keys()}
 
     def test_init(self):
@@ -52,9 +55,8 @@ class TestUnits(unittest.TestCase):
             units_obj._obj['currency'] = np.random.choice(currency_list, size=(units_obj._obj.shape[0]))
             units_obj._obj['dummy_feature'] = np.random.random(size=(units_obj._obj.shape[0]))
             if make_currency_aware:
-                units_obj._obj['dummy_feature'] = units_obj._obj.apply(lambda row: XMoney(row['dummy_feature'],
-                                                                                          row['currency']),
-                                                                       axis=1)
+                units_obj._obj['dummy_feature'] = list(map(XMoney, units_obj._obj['dummy_feature'].to_numpy(),
+                                                           units_obj._obj['currency'].to_numpy()))
 
     def test_convert_currency_aware_column(self):
         if 'qad' not in enabled_modules:
@@ -80,11 +82,12 @@ class TestUnits(unittest.TestCase):
         self.create_currency_column(currency_list=['GBp', 'IEp'], make_currency_aware=False)
         for units_obj in self.units_obj.values():
             panel = units_obj._obj.copy()
-            panel['pence_values'] = panel['dummy_feature'].copy()
+            # assigning a column stores its own copy of the values, so pence_values is unaffected by the conversion
+            panel['pence_values'] = panel['dummy_feature']
             panel = units_obj.convert_pence_to_pounds(df=panel,
                                                       feature_name='dummy_feature',
                                                       feature_currency_name='currency')
-            assert np.allclose(panel['pence_values'], panel['dummy_feature']*100)
+            assert np.allclose(panel['pence_values'].to_numpy(), panel['dummy_feature'].to_numpy()*100)
 
 
 if __name__ == '__main__':
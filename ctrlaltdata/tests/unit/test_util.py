@@ -0,0 +1,22 @@
+import unittest
+import pandas as pd
+
+from ...util import clean_string, clean_string_series
+
+
+class TestUtil(unittest.TestCase):
+    def test_clean_string_series(self):
+        strings = pd.Series(['Sales', 'Net Income (Loss)', 'EPS - Diluted', '12m Return', '5%  growth',
+                             'Cash & Equivalents', 'multi\nline', 'already_clean'])
+        expected = strings.map(clean_string)
+        pd.testing.assert_series_equal(clean_string_series(strings), expected)
+
+    def test_clean_string_series_keeps_index(self):
+        strings = pd.Series(['Total Debt', '1st Quarter'], index=[10, 20])
+        result = clean_string_series(strings)
+        assert list(result.index) == [10, 20]
+        assert list(result) == ['total_debt', 'a1st_quarter']
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,12 +5,14 @@ import numpy as np
 from moneypandas import MoneyArray
 from money import XMoney
 from decimal import Decimal
+from operator import attrgetter
 
 from .resource import ResourceManager
+from .util import convert_pence_to_pounds
 
 
 @pd.api.extensions.register_series_accessor("units")
-class UnitsAccessor(object):
+class UnitsSeriesAccessor(object):
     def __init__(self, pandas_obj):
         self._obj = pandas_obj
         self.unit = None
@@ -44,7 +46,7 @@ class UnitsAccessor(object):
         unique_to_currency = self._obj.to_currency.dropna().unique()
         return unique_from_currency, unique_to_currency
 
-    def convert_currency(self, metric, to_currency='USD', exact_day_match=True):
+    def convert_currency(self, metric, to_currency='USD', exact_day_match=True, from_currency=None):
         """
         changes foreign currency to us dollars at point in time
         These are mid_rates not close prices.
@@ -53,6 +55,8 @@ class UnitsAccessor(object):
         :param metric: str - the value to do the conversion for
         :param to_currency: str - default 'USD'
         :param exact_day_match: bool - the rate to consider for the change
+        :param from_currency: array of str - default None, the distinct currencies of the metric when already known,
+            otherwise they are read off the metric's XMoney values
         :return: pandas dataframe
         input:
             df[['date','closing_price', 'currency']].units.convert_currency(metric='closing_price', to_currency='USD')
@@ -64,38 +68,44 @@ class UnitsAccessor(object):
             2019-03-31      12.310001      AUD           8.744408
         """
 
-        def add_same_currency_rate(df, since, until, to_currency):
+        def same_currency_rates(since, until, to_currency):
             """ Helper function: creates a table to set to rate=1 if from_currency is same as to_currency"""
-            date = pd.to_datetime(pd.date_range(
-                start=since, end=until).tolist())
-            temp = pd.DataFrame(data=date, columns=['date'])
-            temp['from_currency'] = to_currency
-            temp['to_currency'] = to_currency
-            temp['exchange_rate'] = 1.0
-            return pd.concat([df, temp]).reset_index(drop=1)
-
-        def add_pence_rates(feature_df):
+            date = pd.date_range(start=since, end=until)
+            temp = pd.DataFrame({'date': date,
+                                 'from_currency': to_currency,
+                                 'to_currency': to_currency,
+                                 'exchange_rate': np.ones(len(date))})
+            return temp
+
+        def pence_rates(feature_df):
             """Some databases have UK sterling share prices / per share measures in pence GBp not pounds GBP
-            This function adds pence rates from the pound rates that exist
+            This function creates pence rates from the pound rates that exist
             """
-            has_pounds = feature_df[feature_df.from_currency == 'GBP']
-            has_pounds.loc[:, 'from_currency'] = 'GBp'
-            has_pounds.loc[:, 'exchange_rate'] = has_pounds.loc[:,
-                                                                'exchange_rate']*100
-            return pd.concat([feature_df, has_pounds])
-
-        from_currency = np.unique(np.array(
-            [cur.currency for cur in self._obj[metric].values if not type(cur) is float]))
+            has_pounds = feature_df[feature_df.from_currency.to_numpy() == 'GBP']
+            has_pence = has_pounds.assign(from_currency='GBp',
+                                          exchange_rate=has_pounds['exchange_rate'].to_numpy()*100)
+            return has_pence
+
         self._validate_exchange_rate()
+        # the currency column is usually already all in to_currency, which is one array comparison to check
+        if (self._obj['currency'].to_numpy() == to_currency).all():
+            self._obj[metric] = self._obj[metric].astype(float)
+            return self._obj
+
+        if from_currency is None:
+            # read the currency off the non-null XMoney values only, then dedupe the few codes that come back
+            metric_values = self._obj[metric]
+            from_currency = np.unique(
+                metric_values[metric_values.notna()].map(attrgetter('currency')).unique().astype(str))
 
         since, until = self._get_date_range(delta=datetime.timedelta(days=7))
 
-        # if all the from_currency and to_currency are the same don't calculate currency
-        if (from_currency[0] == to_currency) and (len(from_currency) == 1):
+        # if there is nothing to convert, or all the from_currency and to_currency are the same don't calculate currency
+        if len(from_currency) == 0 or ((from_currency[0] == to_currency) and (len(from_currency) == 1)):
             self._obj[metric] = self._obj[metric].astype(float) 
             return self._obj
 
-        # if we have pence but not pounds in the from_currency, add pounds and convert later using add_pence_rates
+        # if we have pence but not pounds in the from_currency, add pounds and convert later using pence_rates
         if "GBp" in from_currency and "GBP" not in from_currency:
             from_currency = np.append(from_currency, np.array(["GBP"]))
 
@@ -103,21 +113,26 @@ class UnitsAccessor(object):
         feature = qad.get_exchange_rate_since_until_by_currency_codes(
             since, until, from_currency, [to_currency])
 
+        # collect the derived rates and concatenate everything once
+        rates = [feature]
         if "GBp" in from_currency:
-            feature = add_pence_rates(feature)
-
-        feature = add_same_currency_rate(feature, since, until, to_currency)
-        feature.sort_values(['date', 'from_currency'], inplace=True)
+            rates.append(pence_rates(feature))
+        rates.append(same_currency_rates(since, until, to_currency))
+        feature = pd.concat(rates, ignore_index=True)
         self._obj = pd.merge_asof(self._obj.sort_values(['date', 'currency']),
-                                  feature.sort_values(
-                                      ['date', 'from_currency']),
+                                  feature.sort_values(['date', 'from_currency']),
                                   on=['date'],
                                   right_by='from_currency',
                                   left_by='currency',
                                   allow_exact_matches=exact_day_match)
     
-        self._obj[metric] = self._obj[metric].astype(float) / self._obj['exchange_rate']
-        return self._obj.drop(['from_currency',	'to_currency', 'exchange_rate'], axis=1)
+        # the merged frame is our own, so divide into a float copy of the metric and drop the rate columns in place;
+        # the copy is explicit because to_numpy can hand back a read-only view under copy-on-write
+        values = self._obj[metric].to_numpy(dtype=np.float64, copy=True)
+        np.divide(values, self._obj['exchange_rate'].to_numpy(dtype=np.float64), out=values)
+        self._obj[metric] = values
+        self._obj.drop(columns=['from_currency', 'to_currency', 'exchange_rate'], inplace=True)
+        return self._obj
 
     def convert_currency_aware_column(self, metric, to_currency='USD', exact_day_match=True):
         """
@@ -139,19 +154,17 @@ class UnitsAccessor(object):
             else:
                 raise TypeError("Value needs to be an XMoney object to perform currency operations.")
         has_metric = (~self._obj[metric].isna())
-        self._obj.loc[has_metric, 'currency'] = self._obj.loc[has_metric, metric].map(try_extract_currency)
+        metric_currency = self._obj.loc[has_metric, metric].map(try_extract_currency)
+        self._obj.loc[has_metric, 'currency'] = metric_currency
+        # the currencies were just read off the values, so convert_currency does not need to read them again
         self._obj = self.convert_currency(metric,
                                           to_currency=to_currency,
-                                          exact_day_match=exact_day_match)
+                                          exact_day_match=exact_day_match,
+                                          from_currency=np.unique(metric_currency.unique().astype(str)))
         return self._obj.drop(columns=['currency'])
 
     @staticmethod
     def convert_pence_to_pounds(df, feature_name, feature_currency_name):
         """
         For a dataframe with a feature and a column for its currency. convert pence value to pounds and the label too"""
-        pence_indexes = df[feature_currency_name].isin(['GBp', 'IEp'])
-        df.loc[pence_indexes,
-               feature_name] = df.loc[pence_indexes, feature_name]/100
-        df.loc[pence_indexes, feature_currency_name] = [
-            i[:-1]+"P" for i in df.loc[pence_indexes, feature_currency_name]]
-        return df
+        return convert_pence_to_pounds(df, feature_name, feature_currency_name)
@@ -60,15 +60,25 @@ def create_source_finder(enabled_modules):
 depends_on = create_depends_on(enabled_modules)
 source_finder = create_source_finder(enabled_modules)
 
+# characters clean_string replaces with an underscore
+_CLEAN_STRING_PATTERN = re.compile('[^a-zA-Z0-9\n]')
+
+
+def _add_check_digits(abbrevs, calc_check_digit):
+    """append the check digit to each abbreviation, computing it once per distinct abbreviation since panels repeat
+    every security on each date"""
+    full = {i: i+calc_check_digit(i) for i in set(abbrevs)}
+    return [full[i] for i in abbrevs]
+
 
 def cusip_abbrev_to_full(cusip8):
     """take an abbreviated cusip 8 digits long and add the checksum final digit"""
-    return [i+CusipClass.calc_check_digit(i) for i in cusip8]
+    return _add_check_digits(cusip8, CusipClass.calc_check_digit)
 
 
 def sedol_abbrev_to_full(sedol6):
     """take an abbreviated sedol 6 digits long and add the checksum final digit"""
-    return [i+SedolClass.calc_check_digit(i) for i in sedol6]
+    return _add_check_digits(sedol6, SedolClass.calc_check_digit)
 
 
 def clean_string(my_str):
@@ -79,21 +89,34 @@ def clean_string(my_str):
     :param my_str: String to clean
     :return: Cleaned string
     """
-    my_new_string = re.sub('[^a-zA-Z0-9 \n]', ' ', my_str)
-    my_new_string = '_'.join(word.lower()
-                            for word in my_new_string.split(' '))
+    # spaces and special characters each become one underscore, without collapsing runs
+    my_new_string = _CLEAN_STRING_PATTERN.sub('_', my_str).lower()
     if my_new_string[0].isnumeric():
         my_new_string = 'a' + my_new_string
 
     return my_new_string
 
+
+def clean_string_series(series):
+    """
+    Vectorised version of `clean_string` for a pandas Series of strings, producing the same output element-wise
+    without calling back into Python for every row.
+    :param series: pandas Series of strings to clean
+    :return: pandas Series of cleaned strings
+    """
+    cleaned = series.str.replace(_CLEAN_STRING_PATTERN, '_', regex=True).str.lower()
+    starts_numeric = cleaned.str[:1].str.isnumeric().fillna(False).astype(bool)
+    return cleaned.where(~starts_numeric, 'a' + cleaned)
+
 def convert_pence_to_pounds(df,feature_name,feature_currency_name):
     """
     For a dataframe with a feature and a column for its currency. convert pence value to pounds and the label too"""
     pence_indexes=df[feature_currency_name].isin(['GBp','IEp'])
-    df.loc[pence_indexes,
-                feature_name]=df.loc[pence_indexes,feature_name]/100
-    df.loc[pence_indexes,feature_currency_name]=[i[:-1]+"P" for i in df.loc[pence_indexes,feature_currency_name]]
+    # an all null currency column is float, which has no .str accessor, so only relabel when there is pence
+    if pence_indexes.any():
+        df.loc[pence_indexes,
+                    feature_name]=df.loc[pence_indexes,feature_name]/100
+        df.loc[pence_indexes,feature_currency_name]=df.loc[pence_indexes,feature_currency_name].str[:-1]+"P"
     return df
 
 def convert_metric_to_currency_aware_column(df, metric_name, currency_column):
@@ -111,7 +134,10 @@ def convert_metric_to_currency_aware_column(df, metric_name, currency_column):
     df.loc[df[currency_column].isna(), [metric_name]] = np.nan
     df.loc[df[currency_column].isna(), [currency_column]] = 'USD'
     non_null=(~df[metric_name].isna())
-    df.loc[non_null,metric_name] = [XMoney(float(row[metric_name]), row[currency_column]) for _, row in df.loc[non_null].iterrows()]
+    # tolist gives plain python floats, as float() did per row
+    values = df.loc[non_null, metric_name].astype(float).tolist()
+    currencies = df.loc[non_null, currency_column].tolist()
+    df.loc[non_null,metric_name] = list(map(XMoney, values, currencies))
     del df[currency_column]
     return df
 